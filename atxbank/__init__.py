@@ -1,4 +1,4 @@
 from .atxbank import AtaraxyBank
 
 def setup(bot):
-    bot.add_cog(AtaraxyBank())
\ No newline at end of file
+    bot.add_cog(AtaraxyBank(bot))
\ No newline at end of file
@@ -0,0 +1,115 @@
+import time
+from collections import Counter
+
+from redbot.core import commands
+
+# command: scope: (calls, seconds). Members get a small burst; the guild bucket
+# only stops floods. Owners change these with `atxbankset ratelimit`.
+DEFAULT_RATE_LIMITS = {
+    "work": {"member": (3, 60), "guild": (60, 10)},
+    "balance": {"member": (5, 30), "guild": (100, 10)},
+}
+SCOPES = ("member", "guild")
+
+
+class RateLimited(commands.CheckFailure):
+    """Raised before invoking a call dropped by `AdmissionControl`."""
+
+
+class TokenBucket:
+    """Allows `calls` per `seconds`, refilled continuously."""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated", "warned")
+
+    def __init__(self, calls, seconds, now):
+        self.capacity = calls
+        self.rate = calls / seconds
+        self.tokens = calls
+        self.updated = now
+        self.warned = False
+
+    def take(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.warned = False
+        return True
+
+    def refund(self):
+        self.tokens += 1
+
+    def retry_after(self):
+        return max(1 - self.tokens, 0) / self.rate
+
+    def idle(self, now):
+        """True once the bucket would have refilled, so dropping it changes nothing."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class AdmissionControl:
+    """Per-member and per-guild token buckets, checked before a command touches storage.
+
+    Everything is in memory; a dropped call costs a dict lookup and some
+    arithmetic. Buckets that have refilled are pruned once there are more
+    than `max_buckets`."""
+
+    def __init__(self, limits=None, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self.limits = {}
+        self.dropped = Counter()
+        self._buckets = {}
+        self.configure(limits or {})
+
+    def configure(self, overrides):
+        """Apply `{command: {scope: [calls, seconds]}}` over the defaults. 0 calls means unlimited."""
+        limits = {command: dict(scopes) for command, scopes in DEFAULT_RATE_LIMITS.items()}
+        for command, scopes in overrides.items():
+            limits.setdefault(command, {}).update({scope: tuple(limit) for scope, limit in scopes.items()})
+        self.limits = {
+            command: {scope: limit for scope, limit in scopes.items() if limit[0] > 0}
+            for command, scopes in limits.items()
+        }
+        self._buckets.clear()
+
+    def _bucket(self, key, limit, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(*limit, now)
+        return bucket
+
+    def _prune(self, now):
+        for key in [key for key, bucket in self._buckets.items() if bucket.idle(now)]:
+            del self._buckets[key]
+
+    def admit(self, command, guild_id, member_id, now=None):
+        """Take a token for one call.
+
+        Returns None when the call may run, otherwise `(retry_after, warn)`.
+        `warn` is only true for a member's first dropped call in a row, so
+        spammers get one reply and are ignored after that."""
+        limits = self.limits.get(command)
+        if not limits:
+            return None
+        if now is None:
+            now = time.monotonic()
+
+        member_bucket = None
+        if "member" in limits:
+            member_bucket = self._bucket((command, guild_id, member_id), limits["member"], now)
+            if not member_bucket.take(now):
+                self.dropped[command] += 1
+                warn = not member_bucket.warned
+                member_bucket.warned = True
+                return member_bucket.retry_after(), warn
+        if "guild" in limits:
+            guild_bucket = self._bucket((command, guild_id), limits["guild"], now)
+            if not guild_bucket.take(now):
+                if member_bucket is not None:
+                    member_bucket.refund()
+                self.dropped[command] += 1
+                return guild_bucket.retry_after(), False
+        return None
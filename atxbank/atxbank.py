@@ -1,35 +1,67 @@
 import asyncio
+import contextlib
+import copy
 import discord
+import io
 import requests
 import json
 import calendar
 import logging
 import random
 import time
+import numpy as np
 from collections import defaultdict, deque, namedtuple
 from enum import Enum
 from math import ceil
-from typing import cast, Iterable, Union, Literal
+from typing import cast, Iterable, Optional, Union, Literal
 from numerize import numerize
 from datetime import datetime, timedelta
+from functools import partial
 
 from redbot.cogs.bank import is_owner_if_bank_global
 from redbot.cogs.mod.converters import RawUserIds
-from redbot.core import Config, bank, commands, errors, checks
+from redbot.core import Config, commands, errors, checks
+from redbot.core.data_manager import cog_data_path
 from redbot.core.commands.converter import TimedeltaConverter
 from redbot.core.bot import Red
 from redbot.core.i18n import Translator, cog_i18n
 from redbot.core.utils import AsyncIter
-from redbot.core.utils.chat_formatting import box, humanize_number
+from redbot.core.utils.chat_formatting import box, humanize_number, pagify
 from redbot.core.utils.menus import close_menu, menu, DEFAULT_CONTROLS
 
 from discord.utils import get
 from disputils import BotEmbedPaginator, BotConfirmation, BotMultipleChoice
 
+from .admission import SCOPES, AdmissionControl, RateLimited
+from .batcher import DepositBatcher
+from .converters import DryRun, RoleTarget
+from .cooldowns import CooldownCache
+from .economy import PERCENTILES, EconomyStatsCache
+from .executor import ChunkedExecutor
+from .history import TransactionLog
+from .jobs import JobStore, compute_job, pending_members, preview_job
+from .leaderboard import RankCache
+from .ledger import BulkLedger, modify_balance
+from .locks import member_locks
+from .menus import LeaderboardSource, TransactionSource, lazy_menu
+from .metrics import Traced, bank, metrics
+from .payouts import NITRO_ODDS, roll_work_payout
+from .profiler import Profiler
+from .sampler import AliasSampler
+from .scheduler import JobScheduler
+from .settings import SettingsCache
+from .singleflight import SingleFlight
+from .sweeper import ClampSweeper
+from .taxes import DEFAULT_TAX_BRACKETS
+from .tiers import DEFAULT_ROLE_TIERS
+
+log = logging.getLogger("red.atxbank")
+
 class AtaraxyBank(commands.Cog):
     """This is a bank extension module for Ataraxy Bank."""
-    def __init__(self):
-        self.config = Config.get_conf(self,identifier=8284624611696967781,force_registration=True)
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = Traced(Config.get_conf(self,identifier=8284624611696967781,force_registration=True), "config")
         defaults_guild = {
             "work_min":0,
             "work_max":0,
@@ -38,16 +70,116 @@ class AtaraxyBank(commands.Cog):
             "draw_payout":0,
             "draw_announcement":0,
             "booster_role_id":0,
-            "voter_role_id":0
+            "voter_role_id":0,
+            "tax_brackets":DEFAULT_TAX_BRACKETS,
+            # DEFAULT_ROLE_TIERS apply until the guild edits its tiers. They are not
+            # registered here: Config merges nested defaults back in on every read.
+            "role_tiers":{},
+            "role_tiers_set":False
+        }
+
+        defaults_global = {
+            "clamp_sweep_mins":60,
+            "mass_chunk_size":2000,
+            "mass_max_in_flight":2,
+            "mass_jobs":{},
+            "schedules":{},
+            "rate_limits":{}
         }
 
         defaults_member = {
             "work_lastused":0
         }
 
+        self.config.register_global(**defaults_global)
         self.config.register_guild(**defaults_guild)
         self.config.register_member(**defaults_member)
 
+        self.settings = SettingsCache(self.config)
+        self.admission = AdmissionControl()
+        self.ranks = RankCache()
+        self.economy = EconomyStatsCache()
+        self.reads = SingleFlight()
+        self.batcher = DepositBatcher(partial(self._on_balances_changed, reason="work"))
+        self.cooldowns = CooldownCache(self.config)
+        self.cooldowns.start()
+        self.sweeper = ClampSweeper(bot, partial(self._on_balances_changed, reason="max balance clamp"))
+        self.executor = ChunkedExecutor()
+        self.jobs = JobStore(self.config)
+        self.history = TransactionLog(cog_data_path(self) / "transactions.db")
+        self.history.start()
+        self.scheduler = JobScheduler(self.config, self._run_schedule)
+        self.profiler = Profiler(self._post_profile)
+        self._invoked = {}
+        self._job_tasks = {}
+        asyncio.create_task(self._initialize())
+
+    async def _initialize(self):
+        self.sweeper.interval = await self.config.clamp_sweep_mins() * 60
+        self.executor.chunk_size = await self.config.mass_chunk_size()
+        self.executor.set_max_in_flight(await self.config.mass_max_in_flight())
+        self.admission.configure(await self.config.rate_limits())
+        await self.bot.wait_until_red_ready()
+        await self._resume_jobs()
+        self.sweeper.start()
+        self.scheduler.start()
+
+    def cog_unload(self):
+        self.sweeper.stop()
+        self.scheduler.stop()
+        # Checkpoints stay in place, so the next load resumes these jobs.
+        for task in self._job_tasks.values():
+            task.cancel()
+        asyncio.create_task(self._shutdown())
+
+    async def _shutdown(self):
+        await self.batcher.close()
+        await self.cooldowns.close()
+        await self.history.close()
+        await self.profiler.stop()
+
+    async def _admit(self, ctx):
+        rejected = self.admission.admit(ctx.command.qualified_name, ctx.guild.id if ctx.guild else 0, ctx.author.id)
+        if rejected is None:
+            return
+        retry_after, warn = rejected
+        if warn:
+            await ctx.send(f"{ctx.author.mention} slow down! Try again in {ceil(retry_after)}s.", delete_after=10)
+        raise RateLimited()
+
+    async def cog_before_invoke(self, ctx):
+        # Only real invocations get here, not the `can_run` checks of help. Still
+        # ahead of any of the command's own code, so a dropped call never reaches storage.
+        await self._admit(ctx)
+        self._invoked[(id(ctx), ctx.command.qualified_name)] = time.perf_counter()
+        self.profiler.before_invoke(ctx)
+
+    async def cog_after_invoke(self, ctx):
+        started = self._invoked.pop((id(ctx), ctx.command.qualified_name), None)
+        if started is not None:
+            metrics.observe(f"command.{ctx.command.qualified_name}", time.perf_counter() - started)
+        await self.profiler.after_invoke(ctx)
+
+    async def _post_profile(self, capture):
+        stem, summary = capture.finish(cog_data_path(self) / "profiles")
+        try:
+            await capture.channel.send(f"Profile of `{capture.label}` saved as `{stem.name}.prof` and `{stem.name}.alloc.txt`.")
+            for page in pagify(summary, shorten_by=16):
+                await capture.channel.send(box(page))
+        except discord.HTTPException:
+            pass
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        if ctx.cog is self and ctx.command is not None and not isinstance(error, RateLimited):
+            metrics.error(f"command.{ctx.command.qualified_name}", getattr(error, "original", error))
+
+    async def _on_balances_changed(self, guild, changes, deltas, reason):
+        """Called with `{member_id: new_balance}` and `{member_id: delta}` after the cog changes balances."""
+        await self.ranks.update(guild, changes)
+        self.reads.invalidate(None if await bank.is_global() else guild)
+        self.history.record(guild, deltas, changes, reason)
+
     @commands.group(name="atxbankset")
     async def atxbankset(self,ctx):
         """Config settings for Ataraxy Bank."""
@@ -62,6 +194,7 @@ class AtaraxyBank(commands.Cog):
         await self.config.guild(ctx.guild).work_cooldown_hrs.set(24)
         await self.config.guild(ctx.guild).draw_payout.set(0)
         await self.config.guild(ctx.guild).draw_announcement.set(0)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Global variables reset to default.")
         await ctx.send(embed=embed)
@@ -79,6 +212,7 @@ class AtaraxyBank(commands.Cog):
             currency = await bank.get_currency_name(ctx.guild)
             await self.config.guild(ctx.guild).work_min.set(minval)
             await self.config.guild(ctx.guild).work_max.set(maxval)
+            self.settings.invalidate(ctx.guild)
 
             embed = discord.Embed(ctx=ctx,description=f"Work payout set to: {minval} {currency} - {maxval} {currency}.")
             return await ctx.send(embed=embed)
@@ -89,6 +223,7 @@ class AtaraxyBank(commands.Cog):
         """Set the work cooldown (in hours). If no values are set, passes through as 24."""
 
         await self.config.guild(ctx.guild).work_cooldown_hrs.set(cooldown)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Work cooldown set to {cooldown} hours.")
         return await ctx.send(embed=embed)
@@ -99,6 +234,7 @@ class AtaraxyBank(commands.Cog):
         """Set payout for draws. If no values are set, passes through as 0."""
 
         await self.config.guild(ctx.guild).draw_required_role.set(roleid)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Required role for draw set to <@&{roleid}>.")
         return await ctx.send(embed=embed)
@@ -111,6 +247,7 @@ class AtaraxyBank(commands.Cog):
         currency = await bank.get_currency_name(ctx.guild)
 
         await self.config.guild(ctx.guild).draw_payout.set(payout)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Draw payout set to {payout} {currency}.")
         return await ctx.send(embed=embed)
@@ -121,16 +258,92 @@ class AtaraxyBank(commands.Cog):
         """Set the channel ID for Draw Announcements."""
 
         await self.config.guild(ctx.guild).draw_announcement.set(channelid)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Announcement channel ID set to <#{channelid}>.")
         return await ctx.send(embed=embed)  
 
+    @contextlib.asynccontextmanager
+    async def _edit_role_tiers(self, guild):
+        """Edit a guild's role tiers, starting from the defaults if it never set any."""
+        group = self.config.guild(guild)
+        tiers = await group.role_tiers()
+        if not tiers and not await group.role_tiers_set():
+            tiers = copy.deepcopy(DEFAULT_ROLE_TIERS)
+        yield tiers
+        await group.role_tiers.set(tiers)
+        await group.role_tiers_set.set(True)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def drawweight(self,ctx,roleid:int,weight:int=0):
+        """Set how many extra draw tickets a role gives. Shortcut for the draw weight of `atxbankset roletier`."""
+
+        if weight < 0:
+            embed = discord.Embed(ctx=ctx,description=f"Weight cannot be negative.")
+            return await ctx.send(embed=embed)
+
+        async with self._edit_role_tiers(ctx.guild) as tiers:
+            role = ctx.guild.get_role(roleid)
+            tier = tiers.setdefault(str(roleid), {"name": role.name if role else str(roleid)})
+            tier["draw_weight"] = weight
+        self.settings.invalidate(ctx.guild)
+
+        embed = discord.Embed(ctx=ctx,description=f"Members with <@&{roleid}> get {weight} extra draw tickets.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def roletier(self,ctx,roleid:int,name=None,work_bonus:int=0,draw_weight:int=0,draw_multiplier:float=1.0,draw_nitro:bool=False):
+        """Set the perks a role gives. If no name is given, removes the role's perks.
+
+        *work_bonus is added to every work payout.
+        *draw_weight is the number of extra draw tickets.
+        *draw_multiplier multiplies draw winnings.
+        *draw_nitro gives draw winners a chance at Nitro instead."""
+
+        async with self._edit_role_tiers(ctx.guild) as tiers:
+            if name is None:
+                tiers.pop(str(roleid), None)
+            else:
+                tiers[str(roleid)] = {
+                    "name": name,
+                    "work_bonus": work_bonus,
+                    "draw_weight": draw_weight,
+                    "draw_multiplier": draw_multiplier,
+                    "draw_nitro": draw_nitro
+                }
+        self.settings.invalidate(ctx.guild)
+
+        if name is None:
+            embed = discord.Embed(ctx=ctx,description=f"Perks removed from <@&{roleid}>.")
+        else:
+            embed = discord.Embed(ctx=ctx,description=f"Perks for <@&{roleid}> set as **{name}**.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def roletiers(self,ctx):
+        """Show the roles that give perks in this server."""
+
+        tiers = (await self.settings.get(ctx.guild)).tiers.tiers
+        if not tiers:
+            embed = discord.Embed(ctx=ctx,description=f"No role perks are set.")
+        else:
+            lines = "\n".join(
+                f"> <@&{role_id}> **{t.name}**: +{t.work_bonus} work, +{t.draw_weight} tickets, x{t.draw_multiplier} draw{', nitro' if t.draw_nitro else ''}"
+                for role_id, t in tiers.items()
+            )
+            embed = discord.Embed(ctx=ctx,description=f"**Role Perks**\n{lines}")
+        return await ctx.send(embed=embed)
+
     @atxbankset.command()
     @commands.is_owner()
     async def voterrole(self,ctx,roleid=0):
         """Set the role ID for Voters."""
 
         await self.config.guild(ctx.guild).voter_role_id.set(roleid)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Voter role set to <@{roleid}>.")
         return await ctx.send(embed=embed)
@@ -141,10 +354,186 @@ class AtaraxyBank(commands.Cog):
         """Set the role ID for Server Boosters"""
 
         await self.config.guild(ctx.guild).booster_role_id.set(roleid)
+        self.settings.invalidate(ctx.guild)
 
         embed = discord.Embed(ctx=ctx,description=f"Booster role set to <@{roleid}>.")
         return await ctx.send(embed=embed)
 
+    @atxbankset.command()
+    @commands.is_owner()
+    async def taxbracket(self,ctx,threshold:int,rate:float=0.0):
+        """Set the tax rate for balances above a threshold. A rate of 0 removes the bracket.
+
+        *rate value must be between 0 and 1."""
+
+        if rate > 1 or rate < 0:
+            embed = discord.Embed(ctx=ctx,description=f"Tax rate must be between 0 and 1.")
+            return await ctx.send(embed=embed)
+
+        async with self.config.guild(ctx.guild).tax_brackets() as brackets:
+            brackets[:] = [b for b in brackets if b[0] != threshold]
+            if rate > 0:
+                brackets.append([threshold,rate])
+            brackets.sort(key=lambda b: b[0])
+        self.settings.invalidate(ctx.guild)
+
+        if rate > 0:
+            embed = discord.Embed(ctx=ctx,description=f"Balances above {humanize_number(threshold)} will be taxed at {rate:.0%}.")
+        else:
+            embed = discord.Embed(ctx=ctx,description=f"Tax bracket above {humanize_number(threshold)} removed.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def taxbrackets(self,ctx):
+        """Show the tax brackets for this server."""
+
+        brackets = (await self.settings.get(ctx.guild)).tax_brackets
+        if not brackets:
+            embed = discord.Embed(ctx=ctx,description=f"No tax brackets are set.")
+        else:
+            lines = "\n".join(f"> Above {humanize_number(threshold)}: {rate:.0%}" for threshold, rate in brackets)
+            embed = discord.Embed(ctx=ctx,description=f"**Tax Brackets**\n{lines}")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def clampsweep(self,ctx,minutes:int=60):
+        """Set how often balances above the max balance are clamped, and run a sweep now. Defaults to 60 minutes."""
+
+        if minutes < 1:
+            embed = discord.Embed(ctx=ctx,description=f"Interval must be at least 1 minute.")
+            return await ctx.send(embed=embed)
+
+        await self.config.clamp_sweep_mins.set(minutes)
+        self.sweeper.interval = minutes * 60
+        self.sweeper.trigger()
+
+        embed = discord.Embed(ctx=ctx,description=f"Balances above the max balance will be clamped every {minutes} minutes.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def masschunks(self,ctx,chunk_size:int=2000,max_in_flight:int=2):
+        """Set how many members guild-wide jobs process per chunk, and how many chunks may write at once.
+
+        Smaller chunks give other commands more turns while taxes or massmoney run."""
+
+        if chunk_size < 1 or max_in_flight < 1:
+            embed = discord.Embed(ctx=ctx,description=f"Values must be at least 1.")
+            return await ctx.send(embed=embed)
+
+        await self.config.mass_chunk_size.set(chunk_size)
+        await self.config.mass_max_in_flight.set(max_in_flight)
+        self.executor.chunk_size = chunk_size
+        self.executor.set_max_in_flight(max_in_flight)
+
+        embed = discord.Embed(ctx=ctx,description=f"Guild-wide jobs will process {chunk_size} members per chunk, {max_in_flight} chunk(s) writing at once.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def ratelimit(self,ctx,command_name=None,scope="member",calls:int=0,seconds:int=60):
+        """Limit how often a command can run, per member or for the whole server. With no arguments, shows the limits.
+
+        Calls over the limit are dropped before touching storage; a member gets one short reply per burst.
+        *command_name is `work` or `balance`, scope is `member` or `guild`. 0 calls removes the limit."""
+
+        if command_name is None:
+            lines = []
+            for name, scopes in self.admission.limits.items():
+                limits = ", ".join(f"{s}: {c} per {sec}s" for s, (c, sec) in scopes.items()) or "unlimited"
+                lines.append(f"> {name}: {limits} ({humanize_number(self.admission.dropped[name])} dropped)")
+            embed = discord.Embed(ctx=ctx,description="**Rate Limits**\n" + "\n".join(lines))
+            return await ctx.send(embed=embed)
+
+        if command_name not in self.admission.limits or scope not in SCOPES:
+            embed = discord.Embed(ctx=ctx,description=f"Command must be one of {', '.join(self.admission.limits)} and scope one of {', '.join(SCOPES)}.")
+            return await ctx.send(embed=embed)
+        if calls < 0 or seconds < 1:
+            embed = discord.Embed(ctx=ctx,description=f"Calls cannot be negative and seconds must be at least 1.")
+            return await ctx.send(embed=embed)
+
+        async with self.config.rate_limits() as limits:
+            limits.setdefault(command_name, {})[scope] = [calls, seconds]
+            self.admission.configure(limits)
+
+        if calls:
+            embed = discord.Embed(ctx=ctx,description=f"`{command_name}` limited to {calls} calls per {seconds} seconds per {scope}.")
+        else:
+            embed = discord.Embed(ctx=ctx,description=f"`{command_name}` no longer has a per-{scope} limit.")
+        return await ctx.send(embed=embed)
+
+    @atxbankset.command()
+    @commands.is_owner()
+    async def stats(self,ctx,mode="summary"):
+        """Show latency and error counts of commands and storage calls.
+
+        Pass `json` for the raw numbers as a file, also written to the cog's data folder for scraping, or `reset` to start over."""
+
+        if mode == "reset":
+            metrics.reset()
+            return await ctx.tick()
+
+        data = metrics.to_dict()
+        if mode == "json":
+            dump = json.dumps(data, indent=2)
+            (cog_data_path(self) / "stats.json").write_text(dump)
+            return await ctx.send(file=discord.File(io.BytesIO(dump.encode()), filename="atxbank-stats.json"))
+
+        series = sorted(data["series"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        if not series:
+            return await ctx.send("Nothing recorded yet.")
+
+        table = f"{'Series':<32}{'Calls':>8}{'Errors':>7}{'Mean':>9}{'p95':>9}\n"
+        for name, hist in series:
+            table += f"{name[:31]:<32}{hist['count']:>8}{hist['errors']:>7}{hist['mean_ms']:>9.1f}{hist['p95_ms']:>9.1f}\n"
+        await ctx.send(f"Recorded over {timedelta(seconds=int(data['uptime_s']))}. Times in ms.")
+        for page in pagify(table, shorten_by=16):
+            await ctx.send(box(page))
+
+    @atxbankset.group()
+    @commands.is_owner()
+    async def profile(self,ctx):
+        """Profile live commands with cProfile and tracemalloc.
+
+        Results are saved in the cog's data folder and summarized in this channel."""
+
+    @profile.command(name="command")
+    async def profile_command(self,ctx,runs:int,*,command_name):
+        """Profile the next runs of one of this cog's commands, e.g. `atxbankset profile command 3 bankleaderboard`.
+
+        The capture ends after 10 minutes even if fewer runs came in."""
+
+        command = self.bot.get_command(command_name)
+        if command is None or command.cog is not self:
+            return await ctx.send("That isn't an Ataraxy Bank command.")
+        if self.profiler.capture is not None:
+            return await ctx.send("A capture is already running. End it with `atxbankset profile stop`.")
+
+        self.profiler.start_command(ctx.channel, command.qualified_name, max(runs, 1))
+        embed = discord.Embed(ctx=ctx,description=f"Profiling the next {max(runs, 1)} runs of `{command.qualified_name}`, for up to 10 minutes.")
+        await ctx.send(embed=embed)
+
+    @profile.command(name="window")
+    async def profile_window(self,ctx,seconds:int=60):
+        """Profile everything the cog does for a number of seconds, up to an hour."""
+
+        if self.profiler.capture is not None:
+            return await ctx.send("A capture is already running. End it with `atxbankset profile stop`.")
+
+        seconds = max(1, min(seconds, 3600))
+        self.profiler.start_window(ctx.channel, seconds)
+        embed = discord.Embed(ctx=ctx,description=f"Profiling for {seconds} seconds.")
+        await ctx.send(embed=embed)
+
+    @profile.command(name="stop")
+    async def profile_stop(self,ctx):
+        """End the running capture now and post what it has so far."""
+
+        if not await self.profiler.stop():
+            await ctx.send("No capture is running.")
+
     @commands.command(aliases=["banklb"])
     @commands.guild_only()
     async def bankleaderboard(self, ctx: commands.Context, top: int = 10):
@@ -163,10 +552,8 @@ class AtaraxyBank(commands.Cog):
         
         show_global = False
         guild = ctx.guild
-        author = ctx.author
         embed_requested = await ctx.embed_requested()
-        footer_message = "Page {page_num}/{page_len}."
-        max_bal = await bank.get_max_balance(ctx.guild)
+        max_bal = (await self.settings.get(ctx.guild)).max_balance
 
         if top < 1:
             top = 10
@@ -175,95 +562,34 @@ class AtaraxyBank(commands.Cog):
         if await bank.is_global() and show_global:
             # show_global is only applicable if bank is global
             bank_sorted = await bank.get_leaderboard(positions=top, guild=None)
+            names = {acc[0]: acc[1]["name"] for acc in bank_sorted}
+            bank_sorted = [(acc[0], acc[1]["balance"]) for acc in bank_sorted]
+            rows = lambda start, stop: bank_sorted[start:stop]
+            total = len(bank_sorted)
             base_embed.set_author(name=ctx.bot.user.name, icon_url=ctx.bot.user.avatar_url)
         else:
-            bank_sorted = await bank.get_leaderboard(positions=top, guild=guild)
+            index = await self.ranks.get(guild)
+            names = index.names
+            # A frozen copy of the requested rows, shared by identical requests.
+            top_rows = await self.reads.get(guild, ("leaderboard", top), partial(self._leaderboard_rows, guild, top))
+            rows = lambda start, stop: top_rows[start:stop]
+            total = len(top_rows)
             if guild:
                 base_embed.set_author(name=guild.name, icon_url=guild.icon_url)
 
-        try:
-            bal_len = len(humanize_number(bank_sorted[0][1]["balance"]))
-            bal_len_max = len(humanize_number(max_bal))
-            if bal_len > bal_len_max:
-                bal_len = bal_len_max
-            # first user is the largest we'll see
-        except IndexError:
+        if total == 0:
             return await ctx.send("There are no accounts in the bank.")
-        pound_len = len(str(len(bank_sorted)))
-        header = "{pound:{pound_len}}{score:{bal_len}}{name:2}\n".format(
-            pound="#",
-            name="Name",
-            score="Wealth",
-            bal_len=bal_len + 6,
-            pound_len=pound_len + 3,
-        )
-        highscores = []
-        pos = 1
-        temp_msg = header
-        for acc in bank_sorted:
-            try:
-                name = guild.get_member(acc[0]).display_name
-            except AttributeError:
-                user_id = ""
-                if await ctx.bot.is_owner(ctx.author):
-                    user_id = f"({str(acc[0])})"
-                name = f"{acc[1]['name']} {user_id}"
-
-            balance = acc[1]["balance"]
-            if balance > max_bal:
-                balance = max_bal
-                await bank.set_balance(MOCK_MEMBER(acc[0], guild), balance)
-            balance = humanize_number(balance)
-            if acc[0] != author.id:
-                temp_msg += (
-                    f"{f'{humanize_number(pos)}.': <{pound_len+2}} "
-                    f"{balance: <{bal_len + 5}} {name}\n"
-                )
 
-            else:
-                temp_msg += (
-                    f"{f'{humanize_number(pos)}.': <{pound_len+2}} "
-                    f"{balance: <{bal_len + 5}} "
-                    f"<<{author.display_name}>>\n"
-                )
-            if pos % 10 == 0:
-                if embed_requested:
-                    embed = base_embed.copy()
-                    embed.description = box(temp_msg, lang="md")
-                    embed.set_footer(
-                        text=footer_message.format(
-                            page_num=len(highscores) + 1,
-                            page_len=ceil(len(bank_sorted) / 10),
-                        )
-                    )
-                    highscores.append(embed)
-                else:
-                    highscores.append(box(temp_msg, lang="md"))
-                temp_msg = header
-            pos += 1
-
-        if temp_msg != header:
-            if embed_requested:
-                embed = base_embed.copy()
-                embed.description = box(temp_msg, lang="md")
-                embed.set_footer(
-                    text=footer_message.format(
-                        page_num=len(highscores) + 1,
-                        page_len=ceil(len(bank_sorted) / 10),
-                    )
-                )
-                highscores.append(embed)
-            else:
-                highscores.append(box(temp_msg, lang="md"))
-
-        if highscores:
-            await menu(
-                ctx,
-                highscores,
-                DEFAULT_CONTROLS if len(highscores) > 1 else {"\N{CROSS MARK}": close_menu},
-            )
-        else:
-            await ctx.send("No balances found.")
+        source = LeaderboardSource(
+            ctx,
+            rows,
+            total,
+            names,
+            max_bal,
+            show_ids=await ctx.bot.is_owner(ctx.author),
+            base_embed=base_embed if embed_requested else None,
+        )
+        await lazy_menu(ctx, source)
 
     @commands.command()
     @commands.guild_only()
@@ -276,121 +602,61 @@ class AtaraxyBank(commands.Cog):
         cur_time = time.time()
         allow_work = False
 
-        work_cooldown = await self.config.guild(ctx.guild).work_cooldown_hrs()
-        last_work = await self.config.member(author).work_lastused()
+        settings = await self.settings.get(guild)
+        work_cooldown = settings.work_cooldown_hrs
+        cooldowns = await self.cooldowns.get(guild)
+        remaining = cooldowns.remaining(author.id, work_cooldown * 3600, cur_time) #convert hours to seconds
 
-        if last_work == 0 or isinstance(last_work,str):
+        if remaining <= 0:
             allow_work = True
+            # Stamped before any await, so a second work can't slip through.
+            cooldowns.stamp(author.id, cur_time)
         else:
-            next_work = last_work + (work_cooldown * 3600) #convert hours to ms
+            dtime_seconds = remaining
+            waittime = ''
 
-            if cur_time >= next_work:
-                allow_work = True
-            else:
-                dtime_seconds = next_work - cur_time
-                waittime = ''
-
-                dtime_days,dtime_seconds = divmod(dtime_seconds,86400)
-                dtime_hours,dtime_seconds = divmod(dtime_seconds,3600)
-                dtime_minutes,dtime_seconds = divmod(dtime_seconds,60)
-
-                if dtime_days > 0:
-                    waittime += f"{int(dtime_days)} days "
-                if dtime_hours > 0:
-                    waittime += f"{int(dtime_hours)} hours "
-                if dtime_minutes > 0:
-                    waittime += f"{int(dtime_minutes)} mins "
-
-                embed = discord.Embed(
-                    description=f"{author.mention} you have to wait {waittime}before you can work again.",
-                    color=(await ctx.embed_colour())
-                    )
+            dtime_days,dtime_seconds = divmod(dtime_seconds,86400)
+            dtime_hours,dtime_seconds = divmod(dtime_seconds,3600)
+            dtime_minutes,dtime_seconds = divmod(dtime_seconds,60)
 
-                await ctx.send(embed=embed)
+            if dtime_days > 0:
+                waittime += f"{int(dtime_days)} days "
+            if dtime_hours > 0:
+                waittime += f"{int(dtime_hours)} hours "
+            if dtime_minutes > 0:
+                waittime += f"{int(dtime_minutes)} mins "
 
-        if allow_work:
+            embed = discord.Embed(
+                description=f"{author.mention} you have to wait {waittime}before you can work again.",
+                color=(await ctx.embed_colour())
+                )
 
-            await self.config.member(author).work_lastused.set(cur_time)
+            await ctx.send(embed=embed)
 
-            work_payout_min = await self.config.guild(ctx.guild).work_min()
-            work_payout_max = await self.config.guild(ctx.guild).work_max()
-            boosterrole = await self.config.guild(ctx.guild).booster_role_id()
-            voterrole = await self.config.guild(ctx.guild).voter_role_id()
+        if allow_work:
 
-            currency = await bank.get_currency_name(ctx.guild)
-            max_bal = await bank.get_max_balance(ctx.guild)
-            current_balance = await bank.get_balance(author)
-
-            is_booster = False
-            is_voter = False
-            is_level40 = False
-            is_level50 = False
-            is_level70 = False #802523620194779179
-            is_level100 = False #802523775219662859
-
-            if boosterrole != 0 or voterrole != 0:
-                for role in author.roles:
-                    if role.id == boosterrole:
-                        is_booster = True
-                    #add voter logic TBD
-                    if role.id == voterrole:
-                        is_voter = True
-                    #Level 40
-                    if role.id == 717286702355316758:
-                        is_level40 = True
-                    #Level 50
-                    if role.id == 802523066918764544:
-                        is_level50 = True
-                    if role.id == 802523620194779179:
-                        is_level70 = True
-                    if role.id == 802523775219662859:
-                        is_level100 = True
-
-            work_payout = random.randint(work_payout_min,work_payout_max)
-           
-            work_payout_bonus = 0
-            work_payout_final = work_payout
-            roll = random.randint(0,10)
-
-            #if voted, extra 25
-            if is_voter:
-                work_payout_final += 25
-            #if booster, receive extra 50
-            if is_booster:
-                work_payout_final += 50
-            #if roll 10, receive double
-            if roll == 10:
-                bonusmult = random.randint(1,10)/10
-                work_payout_bonus = round(work_payout_final * bonusmult)
-                work_payout_final += int(work_payout_bonus)
-
-            if (current_balance + work_payout_final) > max_bal:
-                try:
-                    await bank.set_balance(author, max_bal)
-                except:
-                    pass
+            work_payout_min = settings.work_min
+            work_payout_max = settings.work_max
+            currency = settings.currency
+            perks = settings.tiers.perks(author)
 
-            else:
-                try:
-                    await bank.deposit_credits(author,work_payout_final)
-                except:
-                    pass
+            #role bonuses, e.g. voters and boosters, plus a chance of a special bonus
+            role_bonus = sum(bonus for bonus_name, bonus in perks.work_bonuses)
+            work_payout, work_payout_bonus, work_payout_final = roll_work_payout(work_payout_min, work_payout_max, role_bonus)
 
-            new_bal = await bank.get_balance(author)
+            new_bal = await self.batcher.submit(author, work_payout_final)
 
-            if roll == 10:
+            if work_payout_bonus is not None:
                 workmsg = f"Congratulations {author.mention}, you've earned a bonus - your payouts today are increased!\n**You now have {new_bal} {currency}.**"
             else:
                 workmsg = f"{author.mention}, you've earned some money!\n**You now have {new_bal} {currency}.**"
 
             earn_msg = f"\n> Regular Pay: {work_payout} {currency}"
 
-            if roll == 10:
+            if work_payout_bonus is not None:
                 earn_msg += f"\n> Special Bonus: {int(work_payout_bonus)} {currency}"
-            if is_voter:
-                earn_msg += f"\n> Voter Bonus: 25 {currency}"
-            if is_booster:
-                earn_msg += f"\n> Booster Bonus: 50 {currency}"
+            for bonus_name, bonus in perks.work_bonuses:
+                earn_msg += f"\n> {bonus_name} Bonus: {bonus} {currency}"
 
             embed = discord.Embed(description=workmsg+"\n"+earn_msg+f"\n**Your Total Payout: {work_payout_final} {currency}**",color=(await ctx.embed_colour()))
 
@@ -403,18 +669,19 @@ class AtaraxyBank(commands.Cog):
         if not user:
             user = ctx.author        
 
-        bal = await bank.get_balance(user)
-        currency = await bank.get_currency_name(ctx.guild)
-        max_bal = await bank.get_max_balance(ctx.guild)
+        settings = await self.settings.get(ctx.guild)
+        bal, lb_pos = await self.reads.get(ctx.guild, ("balance", user.id), partial(self._balance_and_rank, user))
+        currency = settings.currency
+        max_bal = settings.max_balance
 
         cur_time = time.time()
-        work_cooldown = await self.config.guild(ctx.guild).work_cooldown_hrs()
-        last_work = await self.config.member(user).work_lastused()
+        work_cooldown = settings.work_cooldown_hrs
+        cooldowns = await self.cooldowns.get(ctx.guild)
+        remaining = cooldowns.remaining(user.id, work_cooldown * 3600, cur_time)
         waittime = ""
 
-        if last_work != 0 or not isinstance(last_work,str):
-            next_work = last_work + (work_cooldown * 3600)
-            dtime_seconds = next_work - cur_time
+        if remaining > 0:
+            dtime_seconds = remaining
             dtime_days,dtime_seconds = divmod(dtime_seconds,86400)
             dtime_hours,dtime_seconds = divmod(dtime_seconds,3600)
             dtime_minutes,dtime_seconds = divmod(dtime_seconds,60)
@@ -432,27 +699,97 @@ class AtaraxyBank(commands.Cog):
             work_msg = f"You can work again in {waittime}."
 
         if bal > max_bal:
+            # Display only; the clamp sweeper fixes the stored balance.
             bal = max_bal
-            await bank.set_balance(user, bal)
-
-        lb_pos = await bank.get_leaderboard_position(user)
 
         if user == ctx.author:
             embed = discord.Embed(
-                description=f"**You have {humanize_number(bal)} {currency}.**\nYou are currently #{lb_pos} on the leaderboard.",
+                description=f"**You have {humanize_number(bal)} {currency}.**\n" + (f"You are currently #{lb_pos} on the leaderboard." if lb_pos else "You are not on the leaderboard yet."),
                 color=(await ctx.embed_colour())
                 )
             embed.set_author(name=f"{user.display_name}#{user.discriminator}",icon_url=user.avatar_url)
             embed.set_footer(text=work_msg)            
         else:
             embed = discord.Embed(
-                description=f"**{user.display_name} has {humanize_number(bal)} {currency}.**\nThey are currently #{lb_pos} on the leaderboard.",
+                description=f"**{user.display_name} has {humanize_number(bal)} {currency}.**\n" + (f"They are currently #{lb_pos} on the leaderboard." if lb_pos else "They are not on the leaderboard yet."),
                 color=(await ctx.embed_colour())
                 )
             embed.set_author(name=f"{user.display_name}#{user.discriminator}",icon_url=user.avatar_url)
             embed.set_footer(text=f"Balance report requested by: {ctx.author.display_name}#{ctx.author.discriminator}")
         await ctx.send(embed=embed)
     
+    async def _leaderboard_rows(self, guild, top):
+        index = await self.ranks.get(guild)
+        return index.top(top)
+
+    async def _balance_and_rank(self, member):
+        bal = await bank.get_balance(member)
+        index = await self.ranks.get(member.guild)
+        # Members without an account get the default balance back; they stay off the board.
+        if member.id in index and index.balance(member.id) != bal:
+            index.update(member.id, bal)
+        return bal, index.rank(member.id)
+
+    @commands.command(aliases=["lbme"])
+    @commands.guild_only()
+    async def bankaround(self, ctx: commands.Context, user: discord.Member = None):
+        """Show the leaderboard positions around you, or around another member."""
+        if not user:
+            user = ctx.author
+
+        index = await self.ranks.get(ctx.guild)
+        start, rows = index.around(user.id)
+        if not rows:
+            return await ctx.send(f"{user.display_name} does not have a bank account.")
+
+        max_bal = (await self.settings.get(ctx.guild)).max_balance
+        source = LeaderboardSource(ctx, index.slice, len(index), index.names, max_bal, show_ids=False)
+
+        embed = discord.Embed(title="Economy Leaderboard",description=source.format_rows(start, rows, user),color=(await ctx.embed_colour()))
+        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon_url)
+        await ctx.send(embed=embed)
+
+    @commands.command(aliases=["ecostats"])
+    @commands.guild_only()
+    async def economystats(self, ctx: commands.Context):
+        """Show the money supply, balance percentiles, accounts at the cap and the Gini coefficient."""
+        settings = await self.settings.get(ctx.guild)
+        index = await self.ranks.get(ctx.guild)
+        stats = self.economy.get(ctx.guild, index, settings.max_balance)
+        if stats is None:
+            return await ctx.send("There are no accounts in the bank.")
+
+        currency = settings.currency
+        percentiles = "\n".join(
+            f"{'Median' if q == 50 else f'p{q}'}: {humanize_number(stats['percentiles'][q])}" for q in PERCENTILES
+        )
+        embed = discord.Embed(title="Economy Stats",color=(await ctx.embed_colour()))
+        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon_url)
+        embed.add_field(name="Money supply",value=f"{humanize_number(stats['supply'])} {currency}")
+        embed.add_field(name="Accounts",value=humanize_number(stats["accounts"]))
+        embed.add_field(name="Mean balance",value=f"{humanize_number(round(stats['mean']))} {currency}")
+        embed.add_field(name="Balances",value=percentiles)
+        embed.add_field(name="At max balance",value=humanize_number(stats["at_cap"]))
+        embed.add_field(name="Empty",value=humanize_number(stats["empty"]))
+        embed.add_field(name="Top 1% hold",value=f"{stats['top_share']:.1%}")
+        embed.add_field(name="Gini",value=f"{stats['gini']:.3f}")
+        await ctx.send(embed=embed)
+
+    @commands.command(aliases=["txs"])
+    @commands.guild_only()
+    async def transactions(self, ctx: commands.Context, user: discord.Member = None):
+        """Show how your balance changed, newest first, or another member's."""
+        if not user:
+            user = ctx.author
+
+        total = await self.history.count(ctx.guild.id, user.id)
+        if total == 0:
+            return await ctx.send(f"No transactions recorded for {user.display_name}.")
+
+        currency = (await self.settings.get(ctx.guild)).currency
+        base_embed = discord.Embed(title=f"Transactions of {user.display_name}",color=(await ctx.embed_colour()))
+        await lazy_menu(ctx, TransactionSource(self.history, user, total, currency, base_embed))
+
     @commands.group(name="bankadmin")
     async def bankadmin(self,ctx):
         """Admin management commands."""
@@ -460,45 +797,16 @@ class AtaraxyBank(commands.Cog):
     @checks.is_owner()
     @bankadmin.command()
     @commands.guild_only()
-    async def ataraxytaxes(self, ctx):
-        """Custom command to apply taxes in Ataraxy."""
+    async def ataraxytaxes(self, ctx, dry_run: DryRun = False):
+        """Custom command to apply taxes in Ataraxy.
 
-        currency = await bank.get_currency_name(ctx.guild)
-        max_bal = await bank.get_max_balance(ctx.guild)
+        Tax brackets are configured with `atxbankset taxbracket`. Pass `--dry-run` to preview the result without changing any balance."""
 
-        for user in ctx.guild.members:
-            if not user.bot:
-                
-                try:
-                    current_balance = await bank.get_balance(user)
-                except:
-                    current_balance = 0
-
-                if current_balance > 0:
-
-                    if current_balance > 10000:
-                        tax_amount = int(current_balance * 0.30)
-                    elif current_balance > 8000:
-                        tax_amount = int(current_balance * 0.15)
-                    elif current_balance > 5000:
-                        tax_amount = int(current_balance * 0.10)
-                    elif current_balance > 3000:
-                        tax_amount = int(current_balance * 0.05)
-                    elif current_balance > 1000:
-                        tax_amount = int(current_balance * 0.02)
-                    else:
-                        tax_amount = 0
-
-                    if (current_balance - tax_amount) < 0:
-                        try:
-                            await bank.set_balance(user, 0)
-                        except:
-                            await ctx.send(f"Error handling taxes for {user}. \nc.bal {current_balance} \nt.amt {tax_amount}")
-                    else:
-                        try:
-                            await bank.withdraw_credits(user, tax_amount)
-                        except:
-                            await ctx.send(f"Error handling taxes for {user}.")
+        brackets = (await self.settings.get(ctx.guild)).tax_brackets
+        if dry_run:
+            return await self._preview_job(ctx, "taxes", {"brackets": brackets})
+        await self._start_job(ctx, "taxes", {"brackets": brackets})
+        await ctx.tick()
 
     @checks.is_owner()
     @bankadmin.command()
@@ -520,6 +828,8 @@ class AtaraxyBank(commands.Cog):
         else:
             if global_bank is True:
                 await bank.bank_prune(self.bot)
+                self.ranks.invalidate()
+                self.reads.invalidate()
                 await ctx.send(
                     _(
                         "Bank accounts for users who "
@@ -529,6 +839,8 @@ class AtaraxyBank(commands.Cog):
 
             if global_bank is False:
                 await bank.bank_prune(self.bot, guild=ctx.guild)
+                self.ranks.invalidate(ctx.guild)
+                self.reads.invalidate(ctx.guild)
                 await ctx.send(
                     _("Bank accounts for users no longer in this server have been deleted.")
                 )
@@ -536,93 +848,64 @@ class AtaraxyBank(commands.Cog):
     @checks.is_owner()
     @commands.command()
     @commands.guild_only()
-    async def bankdraw(self, ctx, confirmation: bool = False):
-        """ Give a a pre-set amount of economy to a random user in the guild/role."""
+    async def bankdraw(self, ctx, winners: int = 1):
+        """ Give a a pre-set amount of economy to a random user in the guild/role.
 
-        draw_payout = await self.config.guild(ctx.guild).draw_payout()
-        draw_announcement = await self.config.guild(ctx.guild).draw_announcement()
-        server_booster_role = await self.config.guild(ctx.guild).booster_role_id()
-        draw_eligible_role = await self.config.guild(ctx.guild).draw_required_role()
-        
-        currency_name = await bank.get_currency_name(ctx.guild)
-        target_channel = discord.utils.get(ctx.guild.channels,id=draw_announcement)
+        Members get extra tickets for each role set with `atxbankset drawweight`. Pass a number to draw several different winners."""
+
+        await self._run_draw(ctx.guild, winners)
+
+    async def _run_draw(self, guild, winners=1):
+        """Draw `winners` weighted winners in `guild` and pay them."""
+        settings = await self.settings.get(guild)
+        draw_payout = settings.draw_payout
+        draw_announcement = settings.draw_announcement
+        draw_eligible_role = settings.draw_required_role
+
+        currency_name = settings.currency
+        target_channel = discord.utils.get(guild.channels,id=draw_announcement)
 
-        booster_perks = True
         eligible_members = []
-        draw_list = []
+        draw_weights = []
 
         #get Mee6 Level 10 role
-        try:
-            draw_eligible_role = ctx.guild.get_role(draw_eligible_role)
+        draw_eligible_role = guild.get_role(draw_eligible_role)
+        if draw_eligible_role is not None:
             draw_members = draw_eligible_role.members
-        except:
-            draw_members = ctx.guild.members
-
-        try:
-            server_booster_role = ctx.guild.get_role(server_booster_role)
-        except:
-            server_booster_role = None
-            booster_perks = False
+        else:
+            draw_members = guild.members
 
         #Admin role
-        #required_role = ctx.guild.get_role(753994711999578133)
+        #required_role = guild.get_role(753994711999578133)
 
         for member in draw_members:
-            if not member.bot and member is not ctx.guild.owner:
+            if not member.bot and member is not guild.owner:
                 eligible_members.append(member)
-                draw_list.append(member)
-
-                for role in member.roles:
-                    #Lv20
-                    if role.id == 717286501146427403:
-                        draw_list.append(member)
-                    #Lv30
-                    if role.id == 717286636060409867:
-                        draw_list.append(member)
-                    #Lv40
-                    if role.id == 717286702355316758:
-                        draw_list.append(member)
-                    #Lv50
-                    if role.id == 802523066918764544:
-                        draw_list.append(member)
+                draw_weights.append(settings.tiers.perks(member).draw_weight)
 
         if len(eligible_members) > 1:
-            random.shuffle(draw_list)
-            winner = random.choice(draw_list)
-            winning_message = f"Congratulations {winner.mention}, you've won today's draw of **{draw_payout} {currency_name}**!"
-            bonus_nitro = False
-            bonus_l70 = False
-            bonus_l100 = False
-
-            #check for nitro bonus
-            for role in winner.roles:
-                if booster_perks:
-                    if role.id == server_booster_role:
-                        bonus_nitro = True
-                if role.id == 802523066918764544:
-                    bonus_nitro = True
-                #L70
-                if role.id == 802523620194779179:
-                    bonus_l70 =  True
-                if role.id == 802523775219662859:
-                    bonus_l100 = True
-
-            if bonus_nitro:                
-                nitro_chance = random.choice(range(1,11))
-                if nitro_chance == 10:
-                    winning_message = f"Congratulations {winner.mention}, you've won **1 months' Discord Nitro!** Please DM <@&644530507505336330> to redeem."
-                    return await target_channel.send(winning_message)
-
-            if bonus_l70:
-                draw_payout = draw_payout * 1.5
-                winning_message += f"```Your Lv70 benefits have boosted your winnings to {draw_payout}!```"
-
-            if bonus_l100:
-                draw_payout = draw_payout * 2
-                winning_message += f"```Your Lv100 benefits have boosted your winnings to {draw_payout}!```"
-                
-            await bank.deposit_credits(winner, draw_payout)
-            await target_channel.send(winning_message)
+            sampler = AliasSampler(draw_weights)
+            for winner_idx in sampler.sample_distinct(winners):
+                winner = eligible_members[winner_idx]
+                await self._pay_draw_winner(winner, settings.tiers.perks(winner), draw_payout, currency_name, target_channel)
+
+    async def _pay_draw_winner(self, winner, perks, draw_payout, currency_name, target_channel):
+        """Apply a draw winner's role perks, pay them and announce it."""
+        winning_message = f"Congratulations {winner.mention}, you've won today's draw of **{draw_payout} {currency_name}**!"
+
+        if perks.draw_nitro:
+            nitro_chance = random.randint(1,NITRO_ODDS)
+            if nitro_chance == NITRO_ODDS:
+                winning_message = f"Congratulations {winner.mention}, you've won **1 months' Discord Nitro!** Please DM <@&644530507505336330> to redeem."
+                return await target_channel.send(winning_message)
+
+        for tier_name, multiplier in perks.draw_multipliers:
+            draw_payout = int(draw_payout * multiplier)
+            winning_message += f"```Your {tier_name} benefits have boosted your winnings to {draw_payout}!```"
+
+        old_bal, new_bal = await modify_balance(winner, lambda balance: balance + int(draw_payout))
+        await self._on_balances_changed(winner.guild, {winner.id: new_bal}, {winner.id: new_bal - old_bal}, "bankdraw")
+        await target_channel.send(winning_message)
 
     @commands.group(name="manageuser")
     async def manageuser(self,ctx):
@@ -647,27 +930,15 @@ class AtaraxyBank(commands.Cog):
 
         if execute:
 
-            currency = await bank.get_currency_name(ctx.guild)
-            max_bal = await bank.get_max_balance(ctx.guild)
-
             if target.bot:
                 await ctx.send("Cannot give money to bots!")
             if not target.bot:
                 try:
-                    current_balance = await bank.get_balance(target)
-
-                    if (current_balance + amount) > max_bal:
-                        try:
-                            await bank.set_balance(target, max_bal)
-                        except:
-                            pass
-                    else:
-                        try:
-                            await bank.deposit_credits(target,amount)
-                        except:
-                            pass
-                except:
-                    pass
+                    old_bal, new_bal = await modify_balance(target, lambda balance: balance + amount)
+                    await self._on_balances_changed(ctx.guild, {target.id: new_bal}, {target.id: new_bal - old_bal}, f"addmoney by {ctx.author.display_name}")
+                except Exception as e:
+                    metrics.error("command.manageuser addmoney", e)
+                    log.exception("Failed to add money to %s", target)
         await ctx.tick()
 
     @checks.admin_or_permissions(manage_guild=True)
@@ -689,27 +960,204 @@ class AtaraxyBank(commands.Cog):
 
         if execute:
 
-            currency = await bank.get_currency_name(ctx.guild)
-            max_bal = await bank.get_max_balance(ctx.guild)
-
             if target.bot:
                 await ctx.send("Cannot remove money from bots!")
             if not target.bot:
                 try:
-                    current_balance = await bank.get_balance(target)
-
-                    if (current_balance - amount) < 0:
-                        try:
-                            await bank.set_balance(target, 0)
-                        except:
-                            pass
-                    else:
-                        try:
-                            await bank.withdraw_credits(target,amount)
-                        except:
-                            pass
-                except:
+                    old_bal, new_bal = await modify_balance(target, lambda balance: balance - amount)
+                    await self._on_balances_changed(ctx.guild, {target.id: new_bal}, {target.id: new_bal - old_bal}, f"removemoney by {ctx.author.display_name}")
+                except Exception as e:
+                    metrics.error("command.manageuser removemoney", e)
+                    log.exception("Failed to remove money from %s", target)
+        await ctx.tick()
+
+    def _job_processor(self, guild, job_id, job):
+        """Chunk processor for a mass job: reads and writes only each chunk's accounts."""
+        kind = job["kind"]
+        params = job["params"]
+        if kind == "taxes":
+            reason = "ataraxytaxes"
+        elif kind == "percent":
+            reason = f"massmoney percent {params['action']} {params['percent']:.2%}"
+        else:
+            reason = f"massmoney numeric {params['action']} {params['amount']}"
+
+        ledger = None
+        # Balances staged by a chunk that may have been committed before the bot stopped.
+        resumed = {int(member_id): balance for member_id, balance in job.get("pending", {}).items()}
+
+        async def process(chunk):
+            nonlocal ledger
+            if ledger is None:
+                ledger = await BulkLedger.load(guild, accounts=False)
+            # Only the chunk's own accounts are read and written, under their stripes.
+            async with member_locks.hold([user.id for user in chunk]):
+                await ledger.refresh(chunk)
+                balances = ledger.balances(chunk)
+                new_balances = compute_job(kind, params, balances)
+                if resumed:
+                    done = [i for i, user in enumerate(chunk) if resumed.pop(user.id, None) == balances[i]]
+                    new_balances[done] = balances[done]
+
+                changed = np.flatnonzero(new_balances != balances)
+                ledger.set_many([chunk[i] for i in changed], new_balances[changed])
+                await self.jobs.stage(job_id, job, ledger.changes)
+                changes = await ledger.commit_accounts()
+            await self._on_balances_changed(guild, changes, ledger.deltas, reason)
+            return changes
+
+        return process
+
+    async def _run_job(self, guild, job_id, job, status=None):
+        """Run a mass job from its checkpoint, saving a new checkpoint after every chunk."""
+        process = self._job_processor(guild, job_id, job)
+
+        async def process_and_checkpoint(chunk):
+            changes = await process(chunk)
+            await self.jobs.checkpoint(job_id, job, chunk)
+            return changes
+
+        if job["kind"] == "taxes":
+            label = "Applying taxes"
+        else:
+            label = f"Applying {job['params']['action']}"
+
+        members = pending_members(guild, job)
+        changes = await self.executor.run(members, process_and_checkpoint, status, label=label)
+        await self.jobs.finish(job_id)
+        return changes
+
+    def _spawn_job(self, guild, job_id, job, status=None):
+        """Run a mass job in a task of its own, which `cog_unload` cancels."""
+        task = asyncio.create_task(self._run_job(guild, job_id, job, status))
+        self._job_tasks[job_id] = task
+        task.add_done_callback(lambda _: self._job_tasks.pop(job_id, None))
+        return task
+
+    async def _start_job(self, ctx, kind, params):
+        status = await ctx.send("Starting...")
+        job_id, job = await self.jobs.create(kind, ctx.guild, ctx.channel, params)
+        return await self._spawn_job(ctx.guild, job_id, job, status)
+
+    async def _preview_job(self, ctx, kind, params):
+        """Reply with what a mass job would change, from one snapshot and without writing."""
+        ledger = await BulkLedger.load(ctx.guild)
+        members = pending_members(ctx.guild, {"params": params, "cursor": 0})
+        preview = preview_job(kind, params, ledger.balances(members), ledger.max_balance)
+        currency = await bank.get_currency_name(ctx.guild)
+
+        embed = discord.Embed(ctx=ctx,title=f"Dry run: {kind}",description=f"Nothing has been changed. {len(members):,} members checked.")
+        embed.add_field(name="Accounts changed",value=humanize_number(preview["affected"]))
+        embed.add_field(name="Minted",value=f"{humanize_number(preview['minted'])} {currency}")
+        embed.add_field(name="Burned",value=f"{humanize_number(preview['burned'])} {currency}")
+        embed.add_field(name="Net",value=f"{humanize_number(preview['minted'] - preview['burned'])} {currency}")
+        embed.add_field(name="Hit max balance",value=humanize_number(preview["capped"]))
+        if preview["top"]:
+            top = "\n".join(
+                f"{members[i].display_name}: {humanize_number(before)} → {humanize_number(after)}"
+                for i, before, after in preview["top"]
+            )
+            embed.add_field(name="Most affected",value=box(top),inline=False)
+        await ctx.send(embed=embed)
+
+    async def _resume_jobs(self):
+        """Pick up mass jobs that were interrupted by a restart."""
+        for job_id, job in (await self.jobs.unfinished()).items():
+            guild = self.bot.get_guild(job["guild_id"])
+            if guild is None:
+                continue
+            status = None
+            channel = guild.get_channel(job["channel_id"])
+            if channel is not None:
+                try:
+                    status = await channel.send(f"Resuming an interrupted job after {job['done']:,} members...")
+                except discord.HTTPException:
                     pass
+            self._spawn_job(guild, job_id, job, status)
+
+    async def _run_schedule(self, schedule):
+        """Run one due schedule directly, without going through a command."""
+        guild = self.bot.get_guild(schedule["guild_id"])
+        if guild is None:
+            return
+        kind = schedule["kind"]
+        params = schedule["params"]
+
+        if kind == "draw":
+            return await self._run_draw(guild, params.get("winners", 1))
+        if kind == "taxes":
+            # Taxes always use the brackets configured at the time of the run.
+            params = {"brackets": (await self.settings.get(guild)).tax_brackets}
+
+        channel = guild.get_channel(schedule["channel_id"])
+        status = None
+        if channel is not None:
+            try:
+                status = await channel.send(f"Starting scheduled {kind} job...")
+            except discord.HTTPException:
+                pass
+        job_id, job = await self.jobs.create(kind, guild, channel, params)
+        return await self._spawn_job(guild, job_id, job, status)
+
+    async def _add_schedule(self, ctx, kind, hours, params):
+        if hours <= 0:
+            return await ctx.send("Interval must be above 0 hours.")
+        schedule_id, schedule = await self.scheduler.add(kind, ctx.guild, ctx.channel, params, hours * 3600)
+        embed = discord.Embed(ctx=ctx,description=f"Scheduled `{kind}` every {hours:g} hours as `{schedule_id}`. First run <t:{int(schedule['next_run'])}:R>.")
+        await ctx.send(embed=embed)
+
+    @checks.is_owner()
+    @bankadmin.group(name="schedule")
+    @commands.guild_only()
+    async def schedule(self,ctx):
+        """Recurring taxes, draws and mass payouts. Runs are posted in the channel they were scheduled from."""
+
+    @schedule.command(name="taxes")
+    async def schedule_taxes(self,ctx,hours:float):
+        """Apply taxes every few hours, with the brackets configured at the time of each run."""
+        await self._add_schedule(ctx, "taxes", hours, {})
+
+    @schedule.command(name="draw")
+    async def schedule_draw(self,ctx,hours:float,winners:int=1):
+        """Run the bank draw every few hours."""
+        await self._add_schedule(ctx, "draw", hours, {"winners": winners})
+
+    @schedule.command(name="percent")
+    async def schedule_percent(self,ctx,hours:float,percent:float,action,target: RoleTarget=None):
+        """Apply `massmoney percent` every few hours."""
+        if action not in ["income","deduction"]:
+            return await ctx.send("Action isn't recognized. Should be *income* or *deduction*.")
+        if percent > 1 or percent < 0:
+            return await ctx.send("Percentage amount is invalid.")
+        await self._add_schedule(ctx, "percent", hours, {"percent": percent, "action": action, "target": target.source if target else None})
+
+    @schedule.command(name="numeric")
+    async def schedule_numeric(self,ctx,hours:float,amount:float,action,target: RoleTarget=None):
+        """Apply `massmoney numeric` every few hours."""
+        if action not in ["income","deduction"]:
+            return await ctx.send("Action isn't recognized. Should be *income* or *deduction*.")
+        if amount < 0:
+            return await ctx.send("Amount is invalid.")
+        await self._add_schedule(ctx, "numeric", hours, {"amount": int(amount), "action": action, "target": target.source if target else None})
+
+    @schedule.command(name="list")
+    async def schedule_list(self,ctx):
+        """List this server's schedules."""
+        schedules = await self.scheduler.for_guild(ctx.guild)
+        if not schedules:
+            return await ctx.send("No schedules set.")
+        lines = []
+        for schedule_id, schedule in sorted(schedules.items(), key=lambda item: item[1]["next_run"]):
+            params = ", ".join(f"{k}={v}" for k, v in schedule["params"].items() if v is not None)
+            lines.append(f"`{schedule_id}` **{schedule['kind']}** every {schedule['interval'] / 3600:g}h {params} - next <t:{int(schedule['next_run'])}:R>")
+        embed = discord.Embed(ctx=ctx,description="\n".join(lines))
+        await ctx.send(embed=embed)
+
+    @schedule.command(name="remove")
+    async def schedule_remove(self,ctx,schedule_id):
+        """Remove a schedule by its ID."""
+        if await self.scheduler.remove(schedule_id, ctx.guild) is None:
+            return await ctx.send("No schedule with that ID in this server.")
         await ctx.tick()
 
     @commands.group(name="massmoney")
@@ -719,13 +1167,15 @@ class AtaraxyBank(commands.Cog):
     @checks.admin_or_permissions(manage_guild=True)
     @massmoney.command()
     @commands.guild_only()
-    async def percent(self, ctx, percent:float, action, target: discord.Role=None):
+    async def percent(self, ctx, percent:float, action, target: Optional[RoleTarget]=None, dry_run: DryRun=False):
         """Apply a percentage increase/decrease to a group of users by role. If a role is not specified, applies to everyone in the server. Does not work on bots.
 
-        Combine this command with the FIFO cog from Fox (https://github.com/bobloy/Fox-V3) to set up recurring behaviour. Multiple runs can be created to apply taxes on multiple roles.
+        Use `bankadmin schedule` to set up recurring behaviour.
+        The target can combine roles, e.g. `"@Lv40 & !@Staff | @Booster"` (quoted): `&` both, `|` either, `!` without. Members holding several of the roles are only paid once.
 
         *action accepts either "income" or "deduction".
-        *percentage value must be between 0 and 1."""
+        *percentage value must be between 0 and 1.
+        *pass `--dry-run` to preview the result without changing any balance."""
 
         execute = True
 
@@ -738,57 +1188,24 @@ class AtaraxyBank(commands.Cog):
 
         if execute:
 
-            currency = await bank.get_currency_name(ctx.guild)
-            max_bal = await bank.get_max_balance(ctx.guild)
-
-            if target == None:
-                ttarget = ctx.guild.members
-            else:
-                ttarget = target.members
-
-            for user in ttarget:
-                if not user.bot:
-                    try:
-                        current_balance = await bank.get_balance(user)
-                        amount_delta = int(current_balance * amount)
-
-                        if action=='deduction':
-                            if (current_balance - amount_delta) < 0:
-                                try:
-                                    await bank.set_balance(user, 0)
-                                except:
-                                    pass
-                            else:
-                                try:
-                                    await bank.withdraw_credits(user, amount_delta)
-                                except:
-                                    pass
-
-                        elif action=='income':
-                            if (current_balance + amount_delta) > max_bal:
-                                try:
-                                    await bank.set_balance(user, max_bal)
-                                except:
-                                    pass
-                            else:
-                                try:
-                                    await bank.deposit_credits(user,amount_delta)
-                                except:
-                                    pass
-                    except:
-                        pass
+            params = {"percent": percent, "action": action, "target": target.source if target else None}
+            if dry_run:
+                return await self._preview_job(ctx, "percent", params)
+            await self._start_job(ctx, "percent", params)
         await ctx.tick()
 
     @checks.admin_or_permissions(manage_guild=True)
     @massmoney.command()
     @commands.guild_only()
-    async def numeric(self, ctx, amount:float, action, target: discord.Role=None):
+    async def numeric(self, ctx, amount:float, action, target: Optional[RoleTarget]=None, dry_run: DryRun=False):
         """Apply a numeric increase/decrease to a group of users by role. If a role is not specified, applies to everyone in the server. Does not work on bots.
 
-        Combine this command with the FIFO cog from Fox (https://github.com/bobloy/Fox-V3) to set up recurring behaviour. Multiple runs can be created to apply taxes on multiple roles.
+        Use `bankadmin schedule` to set up recurring behaviour.
+        The target can combine roles, e.g. `"@Lv40 & !@Staff | @Booster"` (quoted): `&` both, `|` either, `!` without. Members holding several of the roles are only paid once.
 
         *action accepts either "income" or "deduction". Defaults to income.
-        *amount value must be above 0."""
+        *amount value must be above 0.
+        *pass `--dry-run` to preview the result without changing any balance."""
 
         execute = True
 
@@ -801,43 +1218,8 @@ class AtaraxyBank(commands.Cog):
 
         if execute:
 
-            currency = await bank.get_currency_name(ctx.guild)
-            max_bal = await bank.get_max_balance(ctx.guild)
-            amount_delta = int(amount)
-
-            if target == None:
-                ttarget = ctx.guild.members
-            else:
-                ttarget = target.members
-
-            for user in ttarget:
-                if not user.bot:
-                    try:
-                        current_balance = await bank.get_balance(user)
-
-                        if action=='deduction':
-                            if (current_balance - amount_delta) < 0:
-                                try:
-                                    await bank.set_balance(user, 0)
-                                except:
-                                    pass
-                            else:
-                                try:
-                                    await bank.withdraw_credits(user, amount_delta)
-                                except:
-                                    pass
-
-                        elif action=='income':
-                            if (current_balance + amount_delta) > max_bal:
-                                try:
-                                    await bank.set_balance(user, max_bal)
-                                except:
-                                    pass
-                            else:
-                                try:
-                                    await bank.deposit_credits(user,amount_delta)
-                                except:
-                                    pass
-                    except:
-                        pass
-        await ctx.tick()
\ No newline at end of file
+            params = {"amount": int(amount), "action": action, "target": target.source if target else None}
+            if dry_run:
+                return await self._preview_job(ctx, "numeric", params)
+            await self._start_job(ctx, "numeric", params)
+        await ctx.tick()
@@ -0,0 +1,55 @@
+import asyncio
+
+from .ledger import open_ledger
+
+
+class DepositBatcher:
+    """Group-commits deposits such as `work` payouts.
+
+    Deposits arriving within `window` seconds of the first one in a guild are
+    merged: the bank table is read once, every deposit is applied in memory,
+    and the balances are written back in one batched write. Every caller gets
+    their own new balance back."""
+
+    def __init__(self, on_commit, window=0.05):
+        self.on_commit = on_commit
+        self.window = window
+        self._pending = {}
+        self._flushers = {}
+
+    async def submit(self, member, amount):
+        """Queue a deposit and wait for the member's new balance."""
+        guild = member.guild
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(guild.id, []).append((member, amount, future))
+        if guild.id not in self._flushers:
+            self._flushers[guild.id] = asyncio.create_task(self._flush_later(guild))
+        return await future
+
+    async def _flush_later(self, guild):
+        await asyncio.sleep(self.window)
+        del self._flushers[guild.id]
+        await self._flush(guild)
+
+    async def _flush(self, guild):
+        batch = self._pending.pop(guild.id)
+
+        try:
+            async with open_ledger(guild) as ledger:
+                for member, amount, future in batch:
+                    ledger.deposit(member, amount)
+                changes = await ledger.commit()
+        except Exception as e:
+            for member, amount, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for member, amount, future in batch:
+            if not future.done():
+                future.set_result(changes[member.id])
+        await self.on_commit(guild, changes, ledger.deltas)
+
+    async def close(self):
+        """Wait for every batch that is still waiting for its window."""
+        await asyncio.gather(*self._flushers.values(), return_exceptions=True)
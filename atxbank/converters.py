@@ -0,0 +1,22 @@
+from redbot.core import commands
+
+from .targeting import RoleExpression, role_resolver
+
+
+class DryRun(commands.Converter):
+    """Matches a literal `--dry-run` flag."""
+
+    async def convert(self, ctx, argument):
+        if argument.lower() != "--dry-run":
+            raise commands.BadArgument(f"Unknown flag `{argument}`. Did you mean `--dry-run`?")
+        return True
+
+
+class RoleTarget(commands.Converter):
+    """A role expression such as `"@Lv40 & !@Staff | @Booster"`. Quote it if it has spaces."""
+
+    async def convert(self, ctx, argument):
+        try:
+            return RoleExpression.parse(argument, role_resolver(ctx.guild))
+        except ValueError as e:
+            raise commands.BadArgument(str(e))
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from functools import partial
+
+from redbot.core import Config
+
+from .metrics import metrics
+from .singleflight import SingleFlight
+
+log = logging.getLogger("red.atxbank.cooldowns")
+
+
+def _as_stamp(value):
+    # Older versions of the cog stored some stamps as strings.
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CooldownStore:
+    """`work_lastused` stamps for one guild, keyed by member ID."""
+
+    def __init__(self, stamps, dirty=()):
+        self._stamps = stamps
+        self.dirty = set(dirty)
+
+    @classmethod
+    async def load(cls, config, guild):
+        """Read every member's stamp in one Config call."""
+        stamps = {}
+        legacy = []
+        for member_id, data in (await config.all_members(guild)).items():
+            value = data.get("work_lastused", 0)
+            stamps[member_id] = _as_stamp(value)
+            if not isinstance(value, (int, float)):
+                legacy.append(member_id)
+        return cls(stamps, dirty=legacy)
+
+    def last_used(self, member_id):
+        return self._stamps.get(member_id, 0.0)
+
+    def remaining(self, member_id, cooldown, now):
+        """Seconds left before the member can work again; 0 if they can work now."""
+        last_used = self._stamps.get(member_id, 0.0)
+        if not last_used:
+            return 0.0
+        return max(last_used + cooldown - now, 0.0)
+
+    def stamp(self, member_id, when):
+        self._stamps[member_id] = when
+        self.dirty.add(member_id)
+
+
+class CooldownCache:
+    """Loads each guild's `CooldownStore` once and writes dirty stamps back behind the scenes."""
+
+    def __init__(self, config, flush_interval=60):
+        self.config = config
+        self.flush_interval = flush_interval
+        self._stores = {}
+        self._loads = SingleFlight(ttl=0)
+        self._task = None
+
+    async def get(self, guild):
+        store = self._stores.get(guild.id)
+        if store is None:
+            store = await self._loads.get(guild, "stamps", partial(CooldownStore.load, self.config, guild))
+            store = self._stores.setdefault(guild.id, store)
+        return store
+
+    async def flush(self):
+        """Write every guild's dirty stamps, one batched write per guild."""
+        for guild_id, store in list(self._stores.items()):
+            if not store.dirty:
+                continue
+            dirty, store.dirty = store.dirty, set()
+            try:
+                async with self.config._get_base_group(Config.MEMBER, str(guild_id)).all() as data:
+                    for member_id in dirty:
+                        data.setdefault(str(member_id), {})["work_lastused"] = store.last_used(member_id)
+            except Exception as e:
+                store.dirty |= dirty
+                metrics.error("task.cooldown_flush", e)
+                log.exception("Failed to write work cooldowns for guild %s", guild_id)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.flush()
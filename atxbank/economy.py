@@ -0,0 +1,54 @@
+import numpy as np
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+def gini(balances):
+    """Gini coefficient of ascending `balances`: 0 when everyone holds the same, towards 1 when one account holds everything."""
+    values = np.asarray(balances, dtype=np.float64)
+    total = values.sum()
+    if total == 0:
+        return 0.0
+    count = len(values)
+    ranks = np.arange(1, count + 1)
+    return float(2 * (ranks * values).sum() / (count * total) - (count + 1) / count)
+
+
+def economy_stats(balances, max_balance):
+    """Every statistic `economystats` shows, in one vectorized pass over `balances`."""
+    balances = np.sort(np.asarray(balances, dtype=np.int64))
+    count = len(balances)
+    if not count:
+        return None
+    supply = int(balances.sum())
+    top = max(1, count // 100)
+    return {
+        "accounts": count,
+        "supply": supply,
+        "mean": float(balances.mean()),
+        "percentiles": dict(zip(PERCENTILES, np.percentile(balances, PERCENTILES).astype(np.int64).tolist())),
+        "at_cap": int(np.count_nonzero(balances >= max_balance)),
+        "empty": int(np.count_nonzero(balances == 0)),
+        "top_share": float(balances[-top:].sum() / supply) if supply else 0.0,
+        "gini": gini(balances),
+    }
+
+
+class EconomyStatsCache:
+    """Last `economy_stats` result per guild, kept until the guild's rank index changes.
+
+    The index is updated by every balance change the cog makes, so a repeat
+    call with nothing changed in between is a single comparison."""
+
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, guild, index, max_balance):
+        cached = self._cache.get(guild.id)
+        if cached is not None:
+            cached_index, version, cached_max, stats = cached
+            if cached_index is index and version == index.version and cached_max == max_balance:
+                return stats
+        stats = economy_stats(index.balance_array(), max_balance)
+        self._cache[guild.id] = (index, index.version, max_balance, stats)
+        return stats
@@ -0,0 +1,63 @@
+import asyncio
+import contextlib
+import time
+
+import discord
+
+
+def _format_eta(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+class ChunkedExecutor:
+    """Shared runner for guild-wide jobs.
+
+    Members are processed `chunk_size` at a time and the event loop gets a turn
+    between chunks, so a long job never starves other commands. Chunk storage
+    work across every running job is capped at `max_in_flight` by a semaphore."""
+
+    def __init__(self, chunk_size=2000, max_in_flight=2, progress_interval=5.0):
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.set_max_in_flight(max_in_flight)
+
+    def set_max_in_flight(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._storage = asyncio.Semaphore(max_in_flight)
+
+    async def run(self, members, process_chunk, status=None, label="Processing"):
+        """Call `process_chunk(chunk)` over `members` and merge the dicts it returns.
+
+        If `status` is a message, it is edited with progress as the job runs."""
+        total = len(members)
+        results = {}
+        started = last_report = time.monotonic()
+
+        for start in range(0, total, self.chunk_size):
+            chunk = members[start:start + self.chunk_size]
+            async with self._storage:
+                results.update(await process_chunk(chunk))
+            await asyncio.sleep(0)
+
+            done = start + len(chunk)
+            now = time.monotonic()
+            if status is not None and done < total and now - last_report >= self.progress_interval:
+                last_report = now
+                await self._report(status, label, done, total, now - started)
+
+        if status is not None:
+            await self._report(status, label, total, total, time.monotonic() - started)
+        return results
+
+    async def _report(self, status, label, done, total, elapsed):
+        rate = done / elapsed if elapsed > 0 else 0
+        if done >= total:
+            content = f"{label}: done, {done:,} members in {_format_eta(elapsed)}."
+        else:
+            eta = (total - done) / rate if rate else 0
+            content = f"{label}: {done:,}/{total:,} members ({rate:,.0f}/s, ETA {_format_eta(eta)})."
+        with contextlib.suppress(discord.HTTPException):
+            await status.edit(content=content)
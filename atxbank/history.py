@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import metrics
+
+log = logging.getLogger("red.atxbank.history")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    member_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    delta INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    reason TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_member ON transactions (guild_id, member_id, created_at);
+"""
+
+
+class TransactionLog:
+    """Append-only history of every balance change the cog makes, in SQLite.
+
+    Rows are buffered in memory and written by one worker thread with a bulk
+    `executemany` per flush, so a mass job adds rows without waiting on disk.
+    Queries share that connection and thread, so one can wait behind a flush;
+    WAL mode with `synchronous=NORMAL` keeps each flush's commit cheap."""
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="atxbank-history")
+        self._conn = None
+        self._task = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def record(self, guild, deltas, balances, reason):
+        """Queue one row per member whose balance moved."""
+        now = time.time()
+        self._pending.extend(
+            (guild.id, member_id, now, delta, balances[member_id], reason)
+            for member_id, delta in deltas.items()
+            if delta
+        )
+
+    def _insert(self, rows):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO transactions (guild_id, member_id, created_at, delta, balance, reason) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    async def flush(self):
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            with metrics.timer("history.insert"):
+                await self._run(self._insert, rows)
+        except Exception:
+            self._pending[:0] = rows
+            raise
+
+    def _query(self, guild_id, member_id, offset, limit):
+        return self._connect().execute(
+            "SELECT created_at, delta, balance, reason FROM transactions"
+            " WHERE guild_id = ? AND member_id = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (guild_id, member_id, limit, offset),
+        ).fetchall()
+
+    def _count(self, guild_id, member_id):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM transactions WHERE guild_id = ? AND member_id = ?", (guild_id, member_id)
+        ).fetchone()[0]
+
+    async def history(self, guild_id, member_id, offset=0, limit=10):
+        """Newest-first `(created_at, delta, balance, reason)` rows for a member."""
+        await self.flush()
+        with metrics.timer("history.query"):
+            return await self._run(self._query, guild_id, member_id, offset, limit)
+
+    async def count(self, guild_id, member_id):
+        await self.flush()
+        with metrics.timer("history.query"):
+            return await self._run(self._count, guild_id, member_id)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                metrics.error("task.history_flush", e)
+                log.exception("Failed to write transaction history")
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,107 @@
+import time
+import uuid
+
+import numpy as np
+
+from .targeting import RoleExpression
+from .taxes import compute_taxes
+
+
+class JobStore:
+    """Checkpoints of running mass operations, kept in the cog's global Config.
+
+    A job records what to run (`kind` and `params`), where it runs, and a cursor:
+    the ID of the last member whose chunk has been committed. Members are
+    processed in ID order, so a resumed job skips everything up to the cursor.
+
+    Before a chunk is committed, the balances it is about to write are saved
+    as `pending`. If the bot stops between that commit and the checkpoint, the
+    resumed job skips the members already at their pending balance instead of
+    charging them twice."""
+
+    def __init__(self, config):
+        self.config = config
+
+    async def create(self, kind, guild, channel, params):
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "kind": kind,
+            "guild_id": guild.id,
+            "channel_id": getattr(channel, "id", 0),
+            "params": params,
+            "cursor": 0,
+            "done": 0,
+            "pending": {},
+            "started": time.time(),
+        }
+        async with self.config.mass_jobs() as jobs:
+            jobs[job_id] = job
+        return job_id, job
+
+    async def stage(self, job_id, job, targets):
+        """Save the `{member_id: balance}` a chunk is about to commit."""
+        job["pending"] = {str(member_id): balance for member_id, balance in targets.items()}
+        async with self.config.mass_jobs() as jobs:
+            if job_id in jobs:
+                jobs[job_id]["pending"] = job["pending"]
+
+    async def checkpoint(self, job_id, job, chunk):
+        job["cursor"] = chunk[-1].id
+        job["done"] += len(chunk)
+        job["pending"] = {}
+        async with self.config.mass_jobs() as jobs:
+            if job_id in jobs:
+                jobs[job_id]["cursor"] = job["cursor"]
+                jobs[job_id]["done"] = job["done"]
+                jobs[job_id]["pending"] = {}
+
+    async def finish(self, job_id):
+        async with self.config.mass_jobs() as jobs:
+            jobs.pop(job_id, None)
+
+    async def unfinished(self):
+        return await self.config.mass_jobs()
+
+
+def pending_members(guild, job):
+    """Members a job still has to process, in ID order after its cursor."""
+    params = job["params"]
+    target = params.get("target")
+    if not target and params.get("role_id"):
+        # Jobs and schedules saved before role expressions target one role.
+        target = f"<@&{params['role_id']}>"
+    if not target:
+        return sorted((m for m in guild.members if not m.bot and m.id > job["cursor"]), key=lambda m: m.id)
+    member_ids = RoleExpression.parse(target).member_ids(guild)
+    return [guild.get_member(member_id) for member_id in sorted(i for i in member_ids if i > job["cursor"])]
+
+
+def compute_job(kind, params, balances):
+    """New balances under a mass job, before clamping, computed in one vectorized pass."""
+    if kind == "taxes":
+        return balances - compute_taxes(balances, params["brackets"])
+    if kind == "percent":
+        deltas = (balances * params["percent"]).astype(np.int64)
+    else:
+        deltas = np.full_like(balances, int(params["amount"]))
+    if params["action"] == "deduction":
+        return balances - deltas
+    return balances + deltas
+
+
+def preview_job(kind, params, balances, max_balance, top=10):
+    """What a mass job would do to `balances`, without writing anything.
+
+    Returns totals, the number of accounts cut by the max balance, and the
+    indices of the `top` accounts with the largest change."""
+    raw = compute_job(kind, params, balances)
+    new_balances = np.clip(raw, 0, max_balance)
+    deltas = new_balances - balances
+    largest = np.argsort(-np.abs(deltas), kind="stable")[:top]
+    return {
+        "affected": int(np.count_nonzero(deltas)),
+        "minted": int(deltas[deltas > 0].sum()),
+        "burned": int(-deltas[deltas < 0].sum()),
+        "capped": int(np.count_nonzero(raw > max_balance)),
+        "top": [(int(i), int(balances[i]), int(new_balances[i])) for i in largest if deltas[i]],
+    }
@@ -0,0 +1,134 @@
+import time
+from bisect import bisect_left, insort
+from functools import partial
+
+import numpy as np
+
+from .ledger import BulkLedger
+from .metrics import bank
+from .singleflight import SingleFlight
+
+
+class RankIndex:
+    """Sorted index of one guild's bank accounts, highest balance first.
+
+    Entries are `(-balance, member_id)` tuples kept in order, so ranks and
+    slices are found by bisection instead of sorting the whole table."""
+
+    def __init__(self, accounts, names=None):
+        self._balances = dict(accounts)
+        self._keys = sorted((-balance, member_id) for member_id, balance in self._balances.items())
+        self.names = names or {}
+        self.loaded_at = time.monotonic()
+        # Bumped on every change, so derived caches can tell they are stale.
+        self.version = 0
+
+    @classmethod
+    async def load(cls, guild):
+        """Build the index from one read of the guild's bank accounts."""
+        is_global = await bank.is_global()
+        raw_accounts = await BulkLedger.group(guild, is_global).all()
+        accounts = {}
+        names = {}
+        for member_id, account in raw_accounts.items():
+            member_id = int(member_id)
+            if is_global and not guild.get_member(member_id):
+                continue
+            accounts[member_id] = account.get("balance", 0)
+            names[member_id] = account.get("name", "")
+        return cls(accounts, names)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, member_id):
+        return member_id in self._balances
+
+    def balance(self, member_id):
+        return self._balances.get(member_id)
+
+    def update(self, member_id, balance):
+        """Move a member to the position of their new balance."""
+        old = self._balances.get(member_id)
+        if old == balance:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, member_id))]
+        self._balances[member_id] = balance
+        insort(self._keys, (-balance, member_id))
+        self.version += 1
+
+    def update_many(self, changes):
+        """Apply `{member_id: new_balance}` changes.
+
+        Each `update` shifts the sorted list, which is O(n); past about n/32
+        changes, re-sorting once is cheaper."""
+        if len(changes) <= len(self._keys) // 32:
+            for member_id, balance in changes.items():
+                self.update(member_id, balance)
+            return
+        self._balances.update(changes)
+        self._keys = sorted((-balance, member_id) for member_id, balance in self._balances.items())
+        self.version += 1
+
+    def rank(self, member_id):
+        """1-based leaderboard position of a member, or None without an account."""
+        balance = self._balances.get(member_id)
+        if balance is None:
+            return None
+        return bisect_left(self._keys, (-balance, member_id)) + 1
+
+    def slice(self, start, stop):
+        """`(member_id, balance)` rows for 0-based positions start..stop."""
+        return [(member_id, -neg_balance) for neg_balance, member_id in self._keys[start:stop]]
+
+    def balance_array(self):
+        """Every balance as an int64 array, highest first."""
+        return -np.fromiter((neg_balance for neg_balance, member_id in self._keys), dtype=np.int64, count=len(self._keys))
+
+    def top(self, count):
+        return self.slice(0, count)
+
+    def around(self, member_id, radius=5):
+        """Rows surrounding a member, with the 0-based position of the first row."""
+        rank = self.rank(member_id)
+        if rank is None:
+            return 0, []
+        start = max(rank - 1 - radius, 0)
+        return start, self.slice(start, rank + radius)
+
+
+class RankCache:
+    """Per-guild `RankIndex` kept up to date by the cog's own balance changes.
+
+    Indexes are rebuilt after `ttl` seconds so that changes made outside of
+    this cog (other economy cogs, `[p]bankset`) are eventually picked up."""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._cache = {}
+        self._loads = SingleFlight(ttl=0)
+
+    async def get(self, guild):
+        index = self._cache.get(guild.id)
+        if index is None or time.monotonic() - index.loaded_at > self.ttl:
+            index = await self._loads.get(guild, "index", partial(RankIndex.load, guild))
+            self._cache[guild.id] = index
+        return index
+
+    async def update(self, guild, changes):
+        """Apply `{member_id: new_balance}` changes to the guild's index."""
+        if await bank.is_global():
+            # A global account shows up on every guild's board; let the others rebuild.
+            for guild_id in [g for g in self._cache if g != guild.id]:
+                del self._cache[guild_id]
+        index = self._cache.get(guild.id)
+        if index is None:
+            return
+        index.update_many(changes)
+
+    def invalidate(self, guild=None):
+        if guild is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild.id, None)
@@ -0,0 +1,164 @@
+import contextlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .locks import member_locks
+from .metrics import bank
+
+
+class BulkLedger:
+    """In-memory snapshot of a guild's bank accounts.
+
+    All balances are read with a single Config call when the ledger is loaded.
+    Changes are kept in memory, clamped to the bank's limits, and written back
+    together by `commit`."""
+
+    def __init__(self, guild, accounts, default_balance, max_balance, is_global):
+        self.guild = guild
+        self.accounts = accounts
+        self.default_balance = default_balance
+        self.max_balance = max_balance
+        self.is_global = is_global
+        self.changes = {}
+        self.deltas = {}
+        self._names = {}
+
+    @staticmethod
+    def group(guild, is_global):
+        """Raw Config group holding the bank accounts visible from `guild`."""
+        if is_global:
+            return bank._config._get_base_group(bank._config.USER)
+        return bank._config._get_base_group(bank._config.MEMBER, str(guild.id))
+
+    @classmethod
+    async def load(cls, guild, accounts=True):
+        """Read every account of the guild's bank in one go.
+
+        With `accounts=False` only the bank settings are read; call `refresh`
+        before using the ledger."""
+        is_global = await bank.is_global()
+        accounts = await cls.group(guild, is_global).all() if accounts else {}
+        default_balance = await bank.get_default_balance(guild)
+        max_balance = await bank.get_max_balance(guild)
+        return cls(guild, accounts, default_balance, max_balance, is_global)
+
+    async def refresh(self, members=None):
+        """Re-read every account, or only the accounts of `members`.
+
+        A job chunk reads just its own members, one small read each, so its
+        cost follows the chunk size rather than the size of the table."""
+        group = self.group(self.guild, self.is_global)
+        if members is None:
+            self.accounts = await group.all()
+            return
+        self.accounts = {}
+        for member in members:
+            account = await group.get_raw(str(member.id), default=None)
+            if account is not None:
+                self.accounts[str(member.id)] = account
+
+    def balance(self, member):
+        """Current balance of a member, including uncommitted changes."""
+        if member.id in self.changes:
+            return self.changes[member.id]
+        account = self.accounts.get(str(member.id))
+        if account is None:
+            return self.default_balance
+        return account.get("balance", 0)
+
+    def set(self, member, amount):
+        """Stage a new balance, clamped between 0 and the max balance."""
+        amount = max(0, min(int(amount), self.max_balance))
+        self.changes[member.id] = amount
+        self._names[member.id] = getattr(member, "display_name", None) or member.name
+        return amount
+
+    def balances(self, members):
+        """Balances of `members` as an int64 array, in the same order."""
+        return np.fromiter((self.balance(m) for m in members), dtype=np.int64, count=len(members))
+
+    def set_many(self, members, amounts):
+        """Stage new balances for `members` from an array, clamped like `set`."""
+        amounts = np.clip(amounts, 0, self.max_balance)
+        for member, amount in zip(members, amounts.tolist()):
+            self.changes[member.id] = amount
+            self._names[member.id] = getattr(member, "display_name", None) or member.name
+
+    def clamp_over_max(self):
+        """Stage every account above the max balance down to it."""
+        for member_id, account in self.accounts.items():
+            if account.get("balance", 0) > self.max_balance:
+                self.changes[int(member_id)] = self.max_balance
+
+    def deposit(self, member, amount):
+        return self.set(member, self.balance(member) + amount)
+
+    def withdraw(self, member, amount):
+        return self.set(member, self.balance(member) - amount)
+
+    async def commit(self):
+        """Write all staged balances back in a single batched Config write.
+
+        The table is read again first, so writes made since the load are kept.
+        Returns the committed `{member_id: balance}` mapping. How much each
+        balance moved is left in `deltas`."""
+        committed, self.changes = self.changes, {}
+        self.deltas = {}
+        if committed:
+            async with self.group(self.guild, self.is_global).all() as data:
+                self._apply(data, committed)
+        return committed
+
+    async def commit_accounts(self):
+        """Write each staged account on its own, leaving the rest of the table alone.
+
+        For ledgers filled by `refresh(members)` while holding those members'
+        stripes. Returns the same as `commit`."""
+        committed, self.changes = self.changes, {}
+        self.deltas = {}
+        group = self.group(self.guild, self.is_global)
+        self._apply(self.accounts, committed)
+        for member_id in committed:
+            await group.set_raw(str(member_id), value=self.accounts[str(member_id)])
+        return committed
+
+    def _apply(self, data, committed):
+        now = int(datetime.now(timezone.utc).timestamp())
+        for member_id, balance in committed.items():
+            account = data.get(str(member_id))
+            previous = self.default_balance if account is None else account.get("balance", 0)
+            self.deltas[member_id] = balance - previous
+            account = data.setdefault(str(member_id), {})
+            account["balance"] = balance
+            if not account.get("created_at"):
+                account["created_at"] = now
+            if not account.get("name"):
+                account["name"] = self._names.get(member_id, "")
+            self.accounts[str(member_id)] = account
+
+
+@contextlib.asynccontextmanager
+async def open_ledger(guild):
+    """Load a `BulkLedger` while holding every member stripe.
+
+    A commit rewrites the whole table, so no other write may land between
+    the read and the write. Commit before leaving the block."""
+    async with member_locks.hold(None):
+        yield await BulkLedger.load(guild)
+
+
+async def modify_balance(member, update):
+    """Atomically replace a member's balance with `update(balance)`.
+
+    The result is clamped between 0 and the max balance. Only the member's
+    stripe is held, so writes to different members run side by side; batched
+    commits hold every stripe and wait for this write to land. Returns the old
+    and new balance."""
+    async with member_locks.hold([member.id]):
+        balance = await bank.get_balance(member)
+        max_balance = await bank.get_max_balance(getattr(member, "guild", None))
+        new_balance = max(0, min(int(update(balance)), max_balance))
+        if new_balance != balance:
+            await bank.set_balance(member, new_balance)
+        return balance, new_balance
@@ -0,0 +1,37 @@
+import asyncio
+import contextlib
+
+
+class LockStripes:
+    """Fixed pool of asyncio locks, picked by hashing the member ID.
+
+    Operations on the same account always map to the same lock, while
+    unrelated members almost always land on different ones and run in
+    parallel. Multi-member holders take their stripes in index order, so two
+    of them can never deadlock."""
+
+    def __init__(self, size=64):
+        self.size = size
+        self._locks = [asyncio.Lock() for _ in range(size)]
+
+    def stripe(self, member_id):
+        return hash(member_id) % self.size
+
+    def lock_for(self, member_id):
+        return self._locks[self.stripe(member_id)]
+
+    @contextlib.asynccontextmanager
+    async def hold(self, member_ids=None):
+        """Hold the stripes of `member_ids`, or every stripe if None."""
+        if member_ids is None:
+            stripes = range(self.size)
+        else:
+            stripes = sorted({self.stripe(member_id) for member_id in member_ids})
+
+        async with contextlib.AsyncExitStack() as stack:
+            for stripe in stripes:
+                await stack.enter_async_context(self._locks[stripe])
+            yield
+
+
+member_locks = LockStripes()
@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import inspect
+from math import ceil
+
+import discord
+from redbot.core.utils.chat_formatting import box, humanize_number
+from redbot.core.utils.menus import start_adding_reactions
+from redbot.core.utils.predicates import ReactionPredicate
+
+PREV_PAGE = "\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}"
+CLOSE_MENU = "\N{CROSS MARK}"
+NEXT_PAGE = "\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}"
+
+
+class LeaderboardSource:
+    """Formats leaderboard pages from a row accessor, one page at a time.
+
+    `rows(start, stop)` returns `(member_id, balance)` rows for the given
+    0-based positions; nothing is rendered until a page is asked for."""
+
+    per_page = 10
+    footer_message = "Page {page_num}/{page_len}."
+
+    def __init__(self, ctx, rows, total, names, max_bal, show_ids, base_embed=None):
+        self.ctx = ctx
+        self.rows = rows
+        self.total = total
+        self.names = names
+        self.max_bal = max_bal
+        self.show_ids = show_ids
+        self.base_embed = base_embed
+
+        # First user is the largest we'll see, so they set the column width.
+        first = rows(0, 1)
+        self.bal_len = len(humanize_number(min(first[0][1], max_bal))) if first else 0
+        self.pound_len = len(str(total))
+
+    def __len__(self):
+        return ceil(self.total / self.per_page)
+
+    def header(self):
+        return "{pound:{pound_len}}{score:{bal_len}}{name:2}\n".format(
+            pound="#",
+            name="Name",
+            score="Wealth",
+            bal_len=self.bal_len + 6,
+            pound_len=self.pound_len + 3,
+        )
+
+    def format_rows(self, start, rows, highlight):
+        guild = self.ctx.guild
+        temp_msg = self.header()
+        for pos, (member_id, balance) in enumerate(rows, start=start + 1):
+            member = guild.get_member(member_id)
+            if member is not None:
+                name = member.display_name
+            else:
+                user_id = f"({member_id})" if self.show_ids else ""
+                name = f"{self.names.get(member_id, '')} {user_id}"
+            if member_id == highlight.id:
+                name = f"<<{highlight.display_name}>>"
+
+            balance = humanize_number(min(balance, self.max_bal))
+            temp_msg += (
+                f"{f'{humanize_number(pos)}.': <{self.pound_len+2}} "
+                f"{balance: <{self.bal_len + 5}} {name}\n"
+            )
+        return box(temp_msg, lang="md")
+
+    def format_page(self, page):
+        start = page * self.per_page
+        rows = self.rows(start, min(start + self.per_page, self.total))
+        content = self.format_rows(start, rows, self.ctx.author)
+        if self.base_embed is None:
+            return content
+        embed = self.base_embed.copy()
+        embed.description = content
+        embed.set_footer(text=self.footer_message.format(page_num=page + 1, page_len=len(self)))
+        return embed
+
+
+class TransactionSource:
+    """Pages of a member's transaction history, queried one page at a time."""
+
+    per_page = 10
+
+    def __init__(self, history, member, total, currency, base_embed):
+        self.history = history
+        self.member = member
+        self.total = total
+        self.currency = currency
+        self.base_embed = base_embed
+
+    def __len__(self):
+        return ceil(self.total / self.per_page)
+
+    async def format_page(self, page):
+        rows = await self.history.history(self.member.guild.id, self.member.id, page * self.per_page, self.per_page)
+        lines = [
+            f"`{delta:+,}` → {humanize_number(balance)} {self.currency} · {reason} · <t:{int(created_at)}:R>"
+            for created_at, delta, balance, reason in rows
+        ]
+        embed = self.base_embed.copy()
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {page + 1}/{len(self)}.")
+        return embed
+
+
+async def lazy_menu(ctx, source, page=0, timeout=30.0):
+    """Reaction menu that asks `source` for a page only when it is shown.
+
+    `source.format_page` may be a coroutine function."""
+
+    async def page_kwargs(page):
+        content = source.format_page(page)
+        if inspect.isawaitable(content):
+            content = await content
+        if isinstance(content, discord.Embed):
+            return {"content": None, "embed": content}
+        return {"content": content, "embed": None}
+
+    message = await ctx.send(**await page_kwargs(page))
+    emojis = [PREV_PAGE, CLOSE_MENU, NEXT_PAGE] if len(source) > 1 else [CLOSE_MENU]
+    start_adding_reactions(message, emojis)
+
+    while True:
+        pred = ReactionPredicate.with_emojis(emojis, message, ctx.author)
+        try:
+            await ctx.bot.wait_for("reaction_add", check=pred, timeout=timeout)
+        except asyncio.TimeoutError:
+            with contextlib.suppress(discord.Forbidden, discord.NotFound):
+                await message.clear_reactions()
+            return
+
+        emoji = emojis[pred.result]
+        if emoji == CLOSE_MENU:
+            with contextlib.suppress(discord.NotFound):
+                await message.delete()
+            return
+
+        with contextlib.suppress(discord.Forbidden, discord.NotFound):
+            await message.remove_reaction(emoji, ctx.author)
+        page = (page + (1 if emoji == NEXT_PAGE else -1)) % len(source)
+        await message.edit(**await page_kwargs(page))
@@ -0,0 +1,159 @@
+import contextlib
+import inspect
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from redbot.core import bank as _bank
+
+# Upper bounds of the latency buckets, in milliseconds.
+BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+_PLAIN = (str, bytes, int, float, bool, type(None), dict, list, tuple, set, frozenset)
+
+
+class Histogram:
+    """Call count, error count and a fixed-bucket latency histogram for one series."""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets", "last_error")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.last_error = None
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def error(self, exc):
+        self.errors += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def percentile(self, q):
+        """Estimate the `q`th percentile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        lower = 0.0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            if hits and seen + hits >= target:
+                upper = min(bound, self.max_ms)
+                return lower + (upper - lower) * (target - seen) / hits
+            seen += hits
+            lower = bound
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+            "buckets": {("inf" if b == float("inf") else str(b)): n for b, n in zip(BUCKETS_MS, self.buckets) if n},
+            "last_error": self.last_error,
+        }
+
+
+class Metrics:
+    """Named latency and error series, e.g. `command.work` or `bank.get_balance`."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.series = defaultdict(Histogram)
+        self.since = time.time()
+
+    def observe(self, name, seconds):
+        self.series[name].observe(seconds)
+
+    def error(self, name, exc):
+        self.series[name].error(exc)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(name, e)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def to_dict(self):
+        return {
+            "since": self.since,
+            "uptime_s": round(time.time() - self.since, 3),
+            "series": {name: hist.to_dict() for name, hist in sorted(self.series.items())},
+        }
+
+
+metrics = Metrics()
+
+
+class _TracedAwaitable:
+    def __init__(self, awaitable, name):
+        self._awaitable = awaitable
+        self._name = name
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def _run(self):
+        with metrics.timer(self._name):
+            return await self._awaitable
+
+    # Config values are also used as `async with value() as data:` blocks.
+    async def __aenter__(self):
+        with metrics.timer(self._name):
+            return await self._awaitable.__aenter__()
+
+    async def __aexit__(self, *exc_info):
+        with metrics.timer(self._name.rsplit(".", 1)[0] + ".write_back"):
+            return await self._awaitable.__aexit__(*exc_info)
+
+
+class Traced:
+    """Proxy that times every awaitable returned by calls made through it.
+
+    Attribute access and plain calls pass through with their results wrapped
+    again, so a chain like `config.guild(g).work_min.set(0)` is recorded as
+    `config.set`. Awaiting a Config value directly is recorded as `get`."""
+
+    __slots__ = ("_target", "_prefix")
+
+    def __init__(self, target, prefix):
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if isinstance(value, _PLAIN):
+            return value
+        return Traced(value, self._prefix)
+
+    def __call__(self, *args, **kwargs):
+        target = self._target
+        result = target(*args, **kwargs)
+        if inspect.isawaitable(result):
+            op = target.__name__ if inspect.isroutine(target) else "get"
+            return _TracedAwaitable(result, f"{self._prefix}.{op}")
+        if isinstance(result, _PLAIN):
+            return result
+        return Traced(result, self._prefix)
+
+
+bank = Traced(_bank, "bank")
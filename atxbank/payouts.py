@@ -0,0 +1,29 @@
+import random
+
+import numpy as np
+
+# `work` pays a special bonus on one roll in BONUS_ROLL_SIDES, worth
+# 1/BONUS_STEPS to BONUS_STEPS/BONUS_STEPS of the payout so far.
+BONUS_ROLL_SIDES = 11
+BONUS_STEPS = 10
+# Draw winners with a Nitro tier win Nitro instead of money one time in NITRO_ODDS.
+NITRO_ODDS = 10
+
+
+def roll_work_payout(work_min, work_max, role_bonus, rng=random):
+    """One `work` payout as `(regular pay, special bonus or None, total)`."""
+    pay = rng.randint(work_min, work_max)
+    total = pay + role_bonus
+    if rng.randint(0, BONUS_ROLL_SIDES - 1) != BONUS_ROLL_SIDES - 1:
+        return pay, None, total
+    bonus = round(total * rng.randint(1, BONUS_STEPS) / BONUS_STEPS)
+    return pay, bonus, total + bonus
+
+
+def work_payouts(work_min, work_max, role_bonuses, rng, bonus_sides=BONUS_ROLL_SIDES, bonus_steps=BONUS_STEPS):
+    """`roll_work_payout` for an array of members' role bonuses at once."""
+    count = len(role_bonuses)
+    totals = rng.integers(work_min, work_max + 1, size=count) + role_bonuses
+    lucky = rng.integers(0, bonus_sides, size=count) == bonus_sides - 1
+    bonuses = np.round(totals * rng.integers(1, bonus_steps + 1, size=count) / bonus_steps).astype(np.int64)
+    return totals + np.where(lucky, bonuses, 0)
@@ -0,0 +1,125 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class ProfileCapture:
+    """cProfile and tracemalloc data for one capture.
+
+    A command capture only profiles while a matching command is running, so
+    its numbers add up over `runs` invocations. Anything else the event loop
+    runs at the same time is included too."""
+
+    def __init__(self, channel, command=None, runs=0, seconds=0):
+        self.channel = channel
+        self.command = command
+        self.remaining = runs
+        self.seconds = seconds
+        self.started = time.time()
+        self.profile = cProfile.Profile()
+        self._running = 0
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+
+    @property
+    def label(self):
+        return self.command.replace(" ", "_") if self.command else f"window_{self.seconds}s"
+
+    def matches(self, ctx):
+        return self.command is not None and ctx.command.qualified_name == self.command
+
+    def enter(self):
+        if self._running == 0:
+            self.profile.enable()
+        self._running += 1
+
+    def exit(self):
+        """Returns True once the last requested run has finished."""
+        self._running -= 1
+        if self._running == 0:
+            self.profile.disable()
+        self.remaining -= 1
+        return self.remaining <= 0 and self._running == 0
+
+    def finish(self, folder, limit=8):
+        """Write the stats to `folder` and return a short text summary."""
+        if self._running:
+            self.profile.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        allocations = snapshot.compare_to(self._baseline, "lineno")
+
+        folder.mkdir(parents=True, exist_ok=True)
+        stem = folder / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.label}"
+        self.profile.create_stats()
+        if self.profile.stats:
+            stats = pstats.Stats(self.profile)
+            hot = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        else:
+            # A command capture that timed out before any matching run.
+            stats = pstats.Stats()
+            hot = []
+        stats.dump_stats(f"{stem}.prof")
+        with open(f"{stem}.alloc.txt", "w") as f:
+            for stat in allocations[:100]:
+                f.write(f"{stat}\n")
+
+        lines = [f"{'Self ms':>9}{'Total ms':>10}{'Calls':>8}  Function"]
+        for (filename, line, func), (_, calls, self_time, total_time, _) in hot:
+            lines.append(f"{self_time * 1000:>9.1f}{total_time * 1000:>10.1f}{calls:>8}  {func} ({os.path.basename(filename)}:{line})")
+        lines.append("")
+        lines.append(f"{'KiB':>9}{'Blocks':>10}  Allocated at")
+        for stat in allocations[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:>+9.1f}{stat.count_diff:>+10}  {os.path.basename(frame.filename)}:{frame.lineno}")
+        return stem, "\n".join(lines)
+
+
+class Profiler:
+    """At most one running `ProfileCapture`, fed by the cog's invoke hooks."""
+
+    def __init__(self, on_finish):
+        self.on_finish = on_finish
+        self.capture = None
+        self._timer = None
+
+    def start_command(self, channel, command, runs, timeout=600):
+        # tracemalloc slows down the whole bot while it runs, so a capture
+        # waiting on a command that never comes is ended after `timeout`.
+        self.capture = ProfileCapture(channel, command=command, runs=runs)
+        self._timer = asyncio.create_task(self._finish_later(timeout))
+
+    def start_window(self, channel, seconds):
+        self.capture = ProfileCapture(channel, seconds=seconds)
+        self.capture.enter()
+        self._timer = asyncio.create_task(self._finish_later(seconds))
+
+    async def _finish_later(self, seconds):
+        await asyncio.sleep(seconds)
+        await self.stop()
+
+    def before_invoke(self, ctx):
+        if self.capture is not None and self.capture.matches(ctx):
+            self.capture.enter()
+
+    async def after_invoke(self, ctx):
+        if self.capture is not None and self.capture.matches(ctx):
+            if self.capture.exit():
+                await self.stop()
+
+    async def stop(self):
+        """End the current capture early, or when it is done. Returns False if none was running."""
+        capture, self.capture = self.capture, None
+        if capture is None:
+            return False
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        await self.on_finish(capture)
+        return True
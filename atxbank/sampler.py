@@ -0,0 +1,74 @@
+import random
+
+
+class AliasSampler:
+    """Weighted sampler using Vose's alias method.
+
+    Building the table is O(n); each pick is O(1) afterwards, and no entry is
+    ever duplicated to express its weight."""
+
+    def __init__(self, weights, rng=None):
+        self.rng = rng or random
+        self.weights = list(weights)
+        self.size = len(weights)
+        self.prob = [0.0] * self.size
+        self.alias = [0] * self.size
+
+        total = float(sum(weights))
+        if self.size == 0 or total <= 0:
+            raise ValueError("Weights must contain at least one positive value.")
+
+        scaled = [w * self.size / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # Whatever is left is 1 up to rounding error.
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self):
+        """Index of one weighted pick."""
+        column = int(self.rng.random() * self.size)
+        if self.rng.random() < self.prob[column]:
+            return column
+        return self.alias[column]
+
+    def sample_distinct(self, count):
+        """Indices of `count` weighted picks without replacement.
+
+        Repeat picks are rejected, which keeps the odds of each draw proportional
+        to the weights of the entries still left. If rejections pile up (a few
+        heavy entries already taken), the table is rebuilt over the rest."""
+        weights = self.weights
+        count = min(count, sum(1 for w in weights if w > 0))
+        chosen = []
+        taken = set()
+        sampler = self
+        index_map = None
+        misses = 0
+
+        while len(chosen) < count:
+            pick = sampler.sample()
+            if index_map is not None:
+                pick = index_map[pick]
+            if pick in taken:
+                misses += 1
+                if misses > 2 * count + 8:
+                    index_map = [i for i, w in enumerate(weights) if w > 0 and i not in taken]
+                    sampler = AliasSampler([weights[i] for i in index_map], rng=self.rng)
+                    misses = 0
+                continue
+            taken.add(pick)
+            chosen.append(pick)
+        return chosen
@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import logging
+import time
+import uuid
+
+from .metrics import metrics
+
+log = logging.getLogger("red.atxbank.scheduler")
+
+
+class JobScheduler:
+    """Recurring jobs, run by one background task from a heap of next-run times.
+
+    Schedules are kept in the cog's global Config as `{schedule_id: schedule}`.
+    Every schedule that falls due within the same `tick` is popped in one pass,
+    across all guilds, and its next run is saved in a single Config write
+    before the batch is started."""
+
+    def __init__(self, config, run_schedule, tick=30):
+        self.config = config
+        self.run_schedule = run_schedule
+        self.tick = tick
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def load(self):
+        schedules = await self.config.schedules()
+        self._heap = [(schedule["next_run"], schedule_id) for schedule_id, schedule in schedules.items()]
+        heapq.heapify(self._heap)
+
+    async def add(self, kind, guild, channel, params, interval):
+        """Run `kind` with `params` every `interval` seconds, starting one interval from now."""
+        schedule_id = uuid.uuid4().hex[:8]
+        schedule = {
+            "kind": kind,
+            "guild_id": guild.id,
+            "channel_id": getattr(channel, "id", 0),
+            "params": params,
+            "interval": interval,
+            "next_run": time.time() + interval,
+        }
+        async with self.config.schedules() as schedules:
+            schedules[schedule_id] = schedule
+        heapq.heappush(self._heap, (schedule["next_run"], schedule_id))
+        self._wakeup.set()
+        return schedule_id, schedule
+
+    async def remove(self, schedule_id, guild):
+        """Delete a schedule of `guild`. Its heap entry is dropped when it comes up."""
+        async with self.config.schedules() as schedules:
+            if schedules.get(schedule_id, {}).get("guild_id") != guild.id:
+                return None
+            return schedules.pop(schedule_id)
+
+    async def for_guild(self, guild):
+        schedules = await self.config.schedules()
+        return {k: v for k, v in schedules.items() if v["guild_id"] == guild.id}
+
+    async def _run_due(self):
+        now = time.time()
+        due = set()
+        while self._heap and self._heap[0][0] <= now + self.tick:
+            due.add(heapq.heappop(self._heap)[1])
+        if not due:
+            return
+
+        batch = []
+        async with self.config.schedules() as schedules:
+            for schedule_id in due:
+                schedule = schedules.get(schedule_id)
+                if schedule is None:
+                    continue
+                # A run more than a tick late was missed while the bot was offline.
+                # Missed runs are skipped, not replayed, so nothing fires on startup.
+                missed = schedule["next_run"] < now - self.tick
+                next_run = schedule["next_run"] + schedule["interval"]
+                while next_run <= now:
+                    next_run += schedule["interval"]
+                schedule["next_run"] = next_run
+                heapq.heappush(self._heap, (next_run, schedule_id))
+                if not missed:
+                    batch.append((schedule_id, dict(schedule)))
+
+        if batch:
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        results = await asyncio.gather(
+            *(self.run_schedule(schedule) for _, schedule in batch), return_exceptions=True
+        )
+        for (schedule_id, schedule), result in zip(batch, results):
+            if isinstance(result, Exception):
+                metrics.error(f"task.schedule.{schedule['kind']}", result)
+                log.error(
+                    "Scheduled %s job %s failed", schedule["kind"], schedule_id, exc_info=result
+                )
+
+    async def _loop(self):
+        await self.load()
+        while True:
+            try:
+                await self._run_due()
+            except Exception as e:
+                metrics.error("task.scheduler", e)
+                log.exception("Running scheduled jobs failed")
+            self._wakeup.clear()
+            timeout = max(self._heap[0][0] - time.time(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
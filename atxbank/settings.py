@@ -0,0 +1,68 @@
+import time
+
+from .metrics import bank
+from .tiers import DEFAULT_ROLE_TIERS, TierIndex
+
+
+class GuildSettings:
+    """Snapshot of a guild's AtaraxyBank settings, plus the bank options the cog reads often."""
+
+    __slots__ = (
+        "work_min",
+        "work_max",
+        "work_cooldown_hrs",
+        "draw_required_role",
+        "draw_payout",
+        "draw_announcement",
+        "booster_role_id",
+        "voter_role_id",
+        "tax_brackets",
+        "role_tiers",
+        "role_tiers_set",
+        "tiers",
+        "currency",
+        "max_balance",
+        "loaded_at",
+    )
+
+    @classmethod
+    async def load(cls, config, guild):
+        """Build a snapshot from one `config.guild(guild).all()` call."""
+        self = cls()
+        data = await config.guild(guild).all()
+        for key, value in data.items():
+            if key in cls.__slots__:
+                setattr(self, key, value)
+        if not self.role_tiers and not self.role_tiers_set:
+            self.role_tiers = DEFAULT_ROLE_TIERS
+        self.tiers = TierIndex.compile(self.role_tiers, self.voter_role_id, self.booster_role_id)
+        self.currency = await bank.get_currency_name(guild)
+        self.max_balance = await bank.get_max_balance(guild)
+        self.loaded_at = time.monotonic()
+        return self
+
+
+class SettingsCache:
+    """Per-guild cache of `GuildSettings`.
+
+    The cog invalidates a guild whenever one of its own settings changes. Bank
+    options (currency, max balance) are owned by Red's bank, so snapshots also
+    expire after `ttl` seconds to pick up changes made there."""
+
+    def __init__(self, config, ttl=300):
+        self.config = config
+        self.ttl = ttl
+        self._cache = {}
+
+    async def get(self, guild):
+        settings = self._cache.get(guild.id)
+        if settings is None or time.monotonic() - settings.loaded_at > self.ttl:
+            settings = await GuildSettings.load(self.config, guild)
+            self._cache[guild.id] = settings
+        return settings
+
+    def invalidate(self, guild=None):
+        if guild is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild.id, None)
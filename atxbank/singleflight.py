@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+
+class SingleFlight:
+    """Shares one computation between identical concurrent reads, keyed by `(guild, query)`.
+
+    The first caller runs `compute()`; everyone asking for the same key while
+    it runs awaits the same future. The result is then kept for `ttl`
+    seconds, so a burst of identical requests costs one computation. The cog
+    invalidates a guild whenever it changes balances there; a computation
+    that was already running when that happened is not cached. With `ttl=0`
+    nothing is kept and only concurrent callers share a computation."""
+
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self._results = {}
+        self._inflight = {}
+        self._generations = {}
+        self._epoch = 0
+
+    async def get(self, guild, query, compute):
+        results = self._results.get(guild.id)
+        if results is not None:
+            cached = results.get(query)
+            if cached is not None and time.monotonic() - cached[0] <= self.ttl:
+                return cached[1]
+
+        key = (guild.id, query)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self._run(guild.id, query, compute))
+        # One cancelled caller must not cancel the computation for the others.
+        return await asyncio.shield(future)
+
+    async def _run(self, guild_id, query, compute):
+        generation = self._generation(guild_id)
+        try:
+            result = await compute()
+        finally:
+            self._inflight.pop((guild_id, query), None)
+        if self.ttl and self._generation(guild_id) == generation:
+            self._results.setdefault(guild_id, {})[query] = (time.monotonic(), result)
+        return result
+
+    def _generation(self, guild_id):
+        return self._epoch, self._generations.get(guild_id, 0)
+
+    def invalidate(self, guild=None):
+        if guild is None:
+            self._results.clear()
+            self._epoch += 1
+        else:
+            self._results.pop(guild.id, None)
+            self._generations[guild.id] = self._generations.get(guild.id, 0) + 1
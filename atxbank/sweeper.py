@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+
+from .ledger import open_ledger
+from .metrics import bank, metrics
+
+log = logging.getLogger("red.atxbank.sweeper")
+
+
+class ClampSweeper:
+    """Background task that clamps every account above the bank's max balance.
+
+    A guild is swept when its max balance changes, and otherwise every
+    `interval` seconds. Each sweep is one snapshot and one batched write."""
+
+    def __init__(self, bot, on_commit, interval=3600, poll=60):
+        self.bot = bot
+        self.on_commit = on_commit
+        self.interval = interval
+        self.poll = poll
+        self._max_balances = {}
+        self._last_sweep = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def sweep(self, guild):
+        """Clamp over-cap accounts in the bank table `guild` uses."""
+        async with open_ledger(guild) as ledger:
+            ledger.clamp_over_max()
+            changes = await ledger.commit()
+        if changes:
+            log.info("Clamped %s accounts to the max balance in %s", len(changes), guild)
+            await self.on_commit(guild, changes, ledger.deltas)
+        return changes
+
+    def trigger(self):
+        """Sweep every guild now instead of waiting for the interval."""
+        self._last_sweep = 0
+        self._wakeup.set()
+
+    async def _tick(self):
+        due = time.monotonic() - self._last_sweep >= self.interval
+        if due:
+            self._last_sweep = time.monotonic()
+        # A global bank is a single table, so it only needs one sweep.
+        guilds = self.bot.guilds[:1] if await bank.is_global() else self.bot.guilds
+        for guild in guilds:
+            max_bal = await bank.get_max_balance(guild)
+            changed = self._max_balances.get(guild.id) != max_bal
+            self._max_balances[guild.id] = max_bal
+            if due or changed:
+                await self.sweep(guild)
+
+    async def _loop(self):
+        await self.bot.wait_until_red_ready()
+        while True:
+            try:
+                await self._tick()
+            except Exception as e:
+                metrics.error("task.sweeper", e)
+                log.exception("Max balance sweep failed")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
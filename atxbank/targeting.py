@@ -0,0 +1,168 @@
+import re
+
+# Mentions come first: they contain `&` themselves.
+_TOKENS = re.compile(r"\s*(?:(<@&\d+>)|([&|!()])|((?:(?!<@&\d+>)[^&|!()])+))")
+_MENTION = re.compile(r"<@&(\d+)>$")
+EVERYONE = ("everyone", "@everyone")
+
+
+def _stored_role(name):
+    # Saved expressions only ever contain role mentions.
+    match = _MENTION.match(name)
+    if match is None:
+        raise ValueError(f"`{name}` is not a role mention.")
+    return int(match.group(1))
+
+
+def role_resolver(guild):
+    """Resolve a mention, ID or exact role name from an expression to a role ID."""
+    def resolve(name):
+        match = _MENTION.match(name)
+        if match is not None:
+            return int(match.group(1))
+        if name.isdigit() and guild.get_role(int(name)) is not None:
+            return int(name)
+        name = name.lstrip("@")
+        matches = [role for role in guild.roles if role.name.casefold() == name.casefold()]
+        if not matches:
+            raise ValueError(f"No role called `{name}`.")
+        if len(matches) > 1:
+            raise ValueError(f"Several roles are called `{name}`; mention the one you mean.")
+        return matches[0].id
+    return resolve
+
+
+class RoleExpression:
+    """A set expression over roles, such as `@Lv40 & !@Staff | @Booster`.
+
+    `&` is intersection, `|` union and `!` everyone without the role; `!` binds
+    tightest and `&` before `|`, with parentheses for grouping. `everyone`
+    stands for every member. Roles are kept by ID, so `source` survives
+    renames and is what jobs and schedules store."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    @classmethod
+    def parse(cls, text, resolve=_stored_role):
+        tokens = []
+        for mention, op, name in _TOKENS.findall(text):
+            if op:
+                tokens.append(op)
+            elif (mention or name).strip():
+                tokens.append(("name", (mention or name).strip()))
+        if not tokens:
+            raise ValueError("The target expression is empty.")
+        parser = _Parser(tokens, resolve)
+        tree = parser.parse_or()
+        if parser.pos != len(tokens):
+            raise ValueError(f"Unexpected `{parser.describe(tokens[parser.pos])}` in the target expression.")
+        return cls(tree)
+
+    @property
+    def source(self):
+        return _format(self.tree)
+
+    @property
+    def role_ids(self):
+        found = set()
+        stack = [self.tree]
+        while stack:
+            node = stack.pop()
+            if node[0] == "role":
+                found.add(node[1])
+            else:
+                stack.extend(node[1:])
+        return found
+
+    def member_ids(self, guild):
+        """IDs of the non-bot members the expression selects.
+
+        One pass over the member list builds a set per referenced role; the
+        expression is then plain set algebra, so a member is only counted
+        once however many of the roles they hold."""
+        everyone = set()
+        by_role = {role_id: set() for role_id in self.role_ids}
+        for member in guild.members:
+            if member.bot:
+                continue
+            everyone.add(member.id)
+            for role in member.roles:
+                if role.id in by_role:
+                    by_role[role.id].add(member.id)
+        return _evaluate(self.tree, everyone, by_role)
+
+
+class _Parser:
+    def __init__(self, tokens, resolve):
+        self.tokens = tokens
+        self.resolve = resolve
+        self.pos = 0
+
+    @staticmethod
+    def describe(token):
+        return token[1] if isinstance(token, tuple) else token
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self._peek() == "|":
+            self.pos += 1
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self._peek() == "&":
+            self.pos += 1
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        token = self._peek()
+        if token == "!":
+            self.pos += 1
+            return ("not", self.parse_not())
+        if token == "(":
+            self.pos += 1
+            node = self.parse_or()
+            if self._peek() != ")":
+                raise ValueError("Missing `)` in the target expression.")
+            self.pos += 1
+            return node
+        if isinstance(token, tuple):
+            self.pos += 1
+            if token[1].casefold() in EVERYONE:
+                return ("everyone",)
+            return ("role", self.resolve(token[1]))
+        if token is None:
+            raise ValueError("The target expression ends too early.")
+        raise ValueError(f"Unexpected `{token}` in the target expression.")
+
+
+def _format(node, parent_prec=0):
+    kind = node[0]
+    if kind == "role":
+        return f"<@&{node[1]}>"
+    if kind == "everyone":
+        return "everyone"
+    if kind == "not":
+        return "!" + _format(node[1], 3)
+    prec = 1 if kind == "or" else 2
+    text = f"{_format(node[1], prec)} {'|' if kind == 'or' else '&'} {_format(node[2], prec)}"
+    return f"({text})" if prec < parent_prec else text
+
+
+def _evaluate(node, everyone, by_role):
+    kind = node[0]
+    if kind == "role":
+        return by_role[node[1]]
+    if kind == "everyone":
+        return everyone
+    if kind == "not":
+        return everyone - _evaluate(node[1], everyone, by_role)
+    left = _evaluate(node[1], everyone, by_role)
+    right = _evaluate(node[2], everyone, by_role)
+    return left | right if kind == "or" else left & right
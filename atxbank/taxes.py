@@ -0,0 +1,30 @@
+import numpy as np
+
+# [threshold, rate] pairs. A balance strictly above a threshold is taxed at
+# that bracket's rate on the whole balance.
+DEFAULT_TAX_BRACKETS = [
+    [1000, 0.02],
+    [3000, 0.05],
+    [5000, 0.10],
+    [8000, 0.15],
+    [10000, 0.30],
+]
+
+
+def compile_brackets(brackets):
+    """Turn a bracket table into sorted threshold and rate arrays.
+
+    The rate array has a leading 0 for balances below the lowest threshold."""
+    brackets = sorted(brackets, key=lambda b: b[0])
+    thresholds = np.array([b[0] for b in brackets], dtype=np.int64)
+    rates = np.array([0.0] + [b[1] for b in brackets], dtype=np.float64)
+    return thresholds, rates
+
+
+def compute_taxes(balances, brackets):
+    """Tax owed for every balance in `balances`, computed in one vectorized pass."""
+    thresholds, rates = compile_brackets(brackets)
+    balances = np.asarray(balances, dtype=np.int64)
+    bracket_idx = np.searchsorted(thresholds, balances, side="left")
+    taxes = (balances * rates[bracket_idx]).astype(np.int64)
+    return np.clip(taxes, 0, None)
@@ -0,0 +1,61 @@
+from collections import namedtuple
+
+Tier = namedtuple("Tier", "name work_bonus draw_weight draw_multiplier draw_nitro")
+Perks = namedtuple("Perks", "work_bonuses draw_weight draw_multipliers draw_nitro")
+
+NO_PERKS = Perks((), 1, (), False)
+
+# Keyed by role ID as a string, as Config stores it.
+DEFAULT_ROLE_TIERS = {
+    "717286501146427403": {"name": "Lv20", "draw_weight": 1},
+    "717286636060409867": {"name": "Lv30", "draw_weight": 1},
+    "717286702355316758": {"name": "Lv40", "draw_weight": 1},
+    "802523066918764544": {"name": "Lv50", "draw_weight": 1, "draw_nitro": True},
+    "802523620194779179": {"name": "Lv70", "draw_multiplier": 1.5},
+    "802523775219662859": {"name": "Lv100", "draw_multiplier": 2},
+}
+
+
+def make_tier(data):
+    return Tier(
+        name=data.get("name", ""),
+        work_bonus=data.get("work_bonus", 0),
+        draw_weight=data.get("draw_weight", 0),
+        draw_multiplier=data.get("draw_multiplier", 1),
+        draw_nitro=data.get("draw_nitro", False),
+    )
+
+
+class TierIndex:
+    """Compiled role-tier table: which roles carry perks, and what they add up to."""
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self.role_ids = frozenset(tiers)
+
+    @classmethod
+    def compile(cls, role_tiers, voter_role_id=0, booster_role_id=0):
+        """Build the index from the `role_tiers` setting plus the voter and booster roles."""
+        tiers = {}
+        if voter_role_id:
+            tiers[voter_role_id] = Tier("Voter", 25, 0, 1, False)
+        if booster_role_id:
+            tiers[booster_role_id] = Tier("Booster", 50, 0, 1, True)
+        for role_id, data in role_tiers.items():
+            tiers[int(role_id)] = make_tier(data)
+        return cls(tiers)
+
+    def perks(self, member):
+        """Sum up the perks of every tier role a member holds."""
+        matched = self.role_ids.intersection(role.id for role in member.roles)
+        if not matched:
+            return NO_PERKS
+
+        # Keep the table's order so messages list bonuses consistently.
+        tiers = [tier for role_id, tier in self.tiers.items() if role_id in matched]
+        return Perks(
+            work_bonuses=tuple((t.name, t.work_bonus) for t in tiers if t.work_bonus),
+            draw_weight=1 + sum(t.draw_weight for t in tiers),
+            draw_multipliers=tuple((t.name, t.draw_multiplier) for t in tiers if t.draw_multiplier != 1),
+            draw_nitro=any(t.draw_nitro for t in tiers),
+        )
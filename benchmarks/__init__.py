@@ -0,0 +1,5 @@
+"""Offline benchmarks for the atxbank cog.
+
+Everything runs in memory: `fakes` stands in for Red's `Config` and bank
+module, and `model` builds synthetic guilds of any size. Run it with
+`python -m benchmarks --help`."""
@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from .runner import SCENARIOS, run
+
+
+def _csv(kind):
+    def parse(value):
+        return [kind(item) for item in value.split(",") if item]
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline benchmarks for atxbank.")
+    parser.add_argument("--sizes", type=_csv(int), default=[1000, 10000, 100000],
+                        help="comma-separated guild sizes, e.g. 1000,200000 (default: 1000,10000,100000)")
+    parser.add_argument("--scenarios", type=_csv(str), default=list(SCENARIOS),
+                        help="comma-separated scenarios (default: all of %s)" % ", ".join(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=20, help="calls per single-member scenario")
+    parser.add_argument("--mass-iterations", type=int, default=3, help="calls per whole-guild scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenarios: " + ", ".join(sorted(unknown)))
+
+    def progress(result):
+        latency = result["latency_ms"]
+        print(
+            f"{result['scenario']:>18} {result['members']:>7,} members  "
+            f"p50 {latency['p50']:>9.2f}ms  p95 {latency['p95']:>9.2f}ms  "
+            f"storage {sum(result['storage'].values()) / result['iterations']:.1f}/call",
+            file=sys.stderr,
+        )
+
+    results = asyncio.run(run(args.sizes, args.scenarios, args.iterations, args.mass_iterations, args.seed, progress))
+    report = {
+        "schema": 1,
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "mass_iterations": args.mass_iterations,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
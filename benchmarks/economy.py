@@ -0,0 +1,194 @@
+"""Offline economy simulator for tuning payouts, taxes and draws.
+
+Runs the cog's work payout, draw and tax rules as NumPy batches over a
+synthetic population, one step per simulated day. Several parameter sets are
+simulated in parallel with a process pool. Run `python -m benchmarks.economy --help`."""
+import argparse
+import itertools
+import json
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from atxbank.economy import gini
+from atxbank.payouts import NITRO_ODDS, work_payouts
+from atxbank.taxes import DEFAULT_TAX_BRACKETS, compute_taxes
+from atxbank.tiers import DEFAULT_ROLE_TIERS, TierIndex
+
+from .fakes import MAX_BALANCE
+from .model import make_guild, seed_balances
+
+Population = namedtuple("Population", "balances activity taxable role_bonus draw_eligible draw_weight draw_multipliers draw_nitro")
+
+PERCENTILES = (10, 50, 90, 99)
+
+
+def build_population(size, seed=0):
+    """Perk arrays for a synthetic guild, resolved with the cog's own tier rules."""
+    guild, fixtures = make_guild(size, seed)
+    tiers = TierIndex.compile(DEFAULT_ROLE_TIERS, fixtures["voter"].id, fixtures["booster"].id)
+    draw_role = fixtures["draw_role"]
+
+    members = guild.members
+    perks = [tiers.perks(m) for m in members]
+    bots = np.array([m.bot for m in members])
+    rng = np.random.default_rng(seed)
+    return Population(
+        balances=seed_balances(size, seed),
+        # Most members rarely work; a few work every day.
+        activity=np.where(bots, 0.0, rng.beta(0.5, 1.5, size)),
+        # The tax job skips bots.
+        taxable=~bots,
+        role_bonus=np.array([sum(b for _, b in p.work_bonuses) for p in perks], dtype=np.int64),
+        draw_eligible=np.array([not m.bot and m is not guild.owner and draw_role in m.roles for m in members]),
+        draw_weight=np.array([p.draw_weight for p in perks], dtype=np.float64),
+        draw_multipliers=[tuple(mult for _, mult in p.draw_multipliers) for p in perks],
+        draw_nitro=np.array([p.draw_nitro for p in perks]),
+    )
+
+
+def simulate(population, params, days, seed=0):
+    """Simulate `days` of the economy under `params`. Returns daily series and the final distribution."""
+    rng = np.random.default_rng(seed)
+    balances = population.balances.copy()
+    size = len(balances)
+    max_balance = params["max_balance"]
+    brackets = [[threshold, rate * params["tax_scale"]] for threshold, rate in params["tax_brackets"]]
+    works_per_day = max(1, int(24 // params["work_cooldown_hrs"]))
+
+    eligible = np.flatnonzero(population.draw_eligible)
+    draw_p = population.draw_weight[eligible] / population.draw_weight[eligible].sum()
+    winners_per_draw = min(params["draw_winners"], len(eligible))
+
+    series = {"supply": [], "gini": [], "at_cap": [], "minted": [], "taxed": []}
+    series.update({f"p{q}": [] for q in PERCENTILES})
+
+    for day in range(days):
+        before = int(balances.sum())
+        for _ in range(works_per_day):
+            workers = np.flatnonzero(rng.random(size) < population.activity)
+            balances[workers] += work_payouts(params["work_min"], params["work_max"], population.role_bonus[workers], rng)
+
+        for _ in range(params["draws_per_day"]):
+            for winner in rng.choice(eligible, size=winners_per_draw, replace=False, p=draw_p):
+                if population.draw_nitro[winner] and rng.integers(1, NITRO_ODDS + 1) == NITRO_ODDS:
+                    continue
+                payout = params["draw_payout"]
+                for multiplier in population.draw_multipliers[winner]:
+                    payout = int(payout * multiplier)
+                balances[winner] += payout
+        np.clip(balances, 0, max_balance, out=balances)
+        minted = int(balances.sum()) - before
+
+        taxed = 0
+        if params["tax_interval_days"] and (day + 1) % params["tax_interval_days"] == 0:
+            taxes = np.zeros_like(balances)
+            taxes[population.taxable] = compute_taxes(balances[population.taxable], brackets)
+            balances -= taxes
+            taxed = int(taxes.sum())
+
+        series["supply"].append(int(balances.sum()))
+        series["gini"].append(round(gini(np.sort(balances)), 5))
+        series["at_cap"].append(int(np.count_nonzero(balances >= max_balance)))
+        series["minted"].append(minted)
+        series["taxed"].append(taxed)
+        for q, value in zip(PERCENTILES, np.percentile(balances, PERCENTILES)):
+            series[f"p{q}"].append(int(value))
+
+    edges = np.unique(np.concatenate([[0], np.logspace(0, np.log10(max(balances.max(), 10)), 40)]).astype(np.int64))
+    counts, edges = np.histogram(balances, bins=edges)
+    return {
+        "series": series,
+        "final": {
+            "supply": int(balances.sum()),
+            "gini": round(gini(np.sort(balances)), 5),
+            "percentiles": {f"p{q}": int(v) for q, v in zip(PERCENTILES, np.percentile(balances, PERCENTILES))},
+            "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        },
+    }
+
+
+def _run(job):
+    population, params, days, seed = job
+    started = time.perf_counter()
+    result = simulate(population, params, days, seed)
+    return {"params": params, "elapsed_s": round(time.perf_counter() - started, 3), **result}
+
+
+def _csv(kind):
+    def parse(value):
+        return [kind(item) for item in value.split(",") if item]
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.economy", description="Simulate the atxbank economy.")
+    parser.add_argument("--members", type=int, default=60000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--work-min", type=_csv(int), default=[50], help="comma-separated values to sweep")
+    parser.add_argument("--work-max", type=_csv(int), default=[150], help="comma-separated values to sweep")
+    parser.add_argument("--work-cooldown-hrs", type=_csv(float), default=[24.0], help="comma-separated values to sweep")
+    parser.add_argument("--draw-payout", type=_csv(int), default=[500], help="comma-separated values to sweep")
+    parser.add_argument("--draws-per-day", type=_csv(int), default=[1], help="comma-separated values to sweep")
+    parser.add_argument("--draw-winners", type=int, default=1)
+    parser.add_argument("--tax-scale", type=_csv(float), default=[1.0],
+                        help="multiplier on every bracket's rate, comma-separated values to sweep")
+    parser.add_argument("--tax-interval-days", type=_csv(int), default=[7],
+                        help="days between tax runs, 0 for none; comma-separated values to sweep")
+    parser.add_argument("--tax-brackets", type=json.loads, default=DEFAULT_TAX_BRACKETS,
+                        help="JSON list of [threshold, rate] pairs (default: the cog's defaults)")
+    parser.add_argument("--max-balance", type=int, default=MAX_BALANCE)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    sweep = {
+        "work_min": args.work_min,
+        "work_max": args.work_max,
+        "work_cooldown_hrs": args.work_cooldown_hrs,
+        "draw_payout": args.draw_payout,
+        "draws_per_day": args.draws_per_day,
+        "tax_scale": args.tax_scale,
+        "tax_interval_days": args.tax_interval_days,
+    }
+    fixed = {"draw_winners": args.draw_winners, "tax_brackets": args.tax_brackets, "max_balance": args.max_balance}
+    param_sets = [dict(zip(sweep, values), **fixed) for values in itertools.product(*sweep.values())]
+    param_sets = [p for p in param_sets if p["work_min"] <= p["work_max"]]
+    if not param_sets:
+        parser.error("no valid parameter sets: work_min must not exceed work_max")
+
+    started = time.perf_counter()
+    population = build_population(args.members, args.seed)
+    jobs = [(population, params, args.days, args.seed) for params in param_sets]
+    if len(jobs) == 1:
+        runs = [_run(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            runs = list(pool.map(_run, jobs))
+
+    for run in runs:
+        final = run["final"]
+        swept = ", ".join(f"{k}={run['params'][k]}" for k in sweep if len(sweep[k]) > 1) or "defaults"
+        print(f"{swept}: supply {final['supply']:,}, gini {final['gini']:.3f}, "
+              f"median {final['percentiles']['p50']:,} ({run['elapsed_s']:.2f}s)", file=sys.stderr)
+
+    report = {
+        "schema": 1,
+        "meta": {"members": args.members, "days": args.days, "seed": args.seed,
+                 "elapsed_s": round(time.perf_counter() - started, 3)},
+        "runs": runs,
+    }
+    output = json.dumps(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import copy
+import time
+from collections import Counter
+
+from redbot.core import bank, errors
+
+_MISSING = object()
+MAX_BALANCE = 2 ** 63 - 1
+
+
+class StorageStats:
+    """Counts of Config reads and writes, and of bank API calls."""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, op):
+        self.counts[op] += 1
+
+    def reset(self):
+        self.counts.clear()
+
+    def snapshot(self):
+        return dict(sorted(self.counts.items()))
+
+
+stats = StorageStats()
+
+
+class _ValueContext:
+    """What `Value.__call__` returns in Red: awaitable, or an async context manager
+    that writes the value back on exit if it changed."""
+
+    def __init__(self, value, default):
+        self.value = value
+        self.default = default
+        self.raw = None
+        self._original = None
+
+    def __await__(self):
+        return self.value.get(self.default).__await__()
+
+    async def __aenter__(self):
+        self.raw = await self.value.get(self.default)
+        self._original = copy.deepcopy(self.raw)
+        return self.raw
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None and self.raw != self._original:
+            await self.value.set(self.raw)
+
+
+class FakeValue:
+    def __init__(self, config, path, default=None):
+        self._config = config
+        self._path = path
+        self._default = default
+
+    def __call__(self, default=_MISSING):
+        return _ValueContext(self, self._default if default is _MISSING else default)
+
+    async def get(self, default=None):
+        stats.record("config.read")
+        stored = self._config._read(self._path)
+        if isinstance(default, dict):
+            # Registered groups fill in their defaults, like Red does.
+            merged = copy.deepcopy(default)
+            if stored is not _MISSING:
+                merged.update(copy.deepcopy(stored))
+            return merged
+        if stored is _MISSING:
+            return copy.deepcopy(default)
+        return copy.deepcopy(stored)
+
+    async def set(self, value):
+        stats.record("config.write")
+        self._config._write(self._path, copy.deepcopy(value))
+
+    async def clear(self):
+        stats.record("config.write")
+        self._config._delete(self._path)
+
+
+class FakeGroup(FakeValue):
+    def __init__(self, config, path, defaults=None):
+        super().__init__(config, path, defaults if defaults is not None else {})
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FakeValue(self._config, self._path + (name,), self._default.get(name))
+
+    def all(self):
+        return self()
+
+    async def get_raw(self, *keys, default=_MISSING):
+        stats.record("config.read")
+        stored = self._config._read(self._path + keys)
+        if stored is _MISSING:
+            if default is _MISSING:
+                raise KeyError(keys[-1])
+            return default
+        return copy.deepcopy(stored)
+
+    async def set_raw(self, *keys, value):
+        stats.record("config.write")
+        self._config._write(self._path + keys, copy.deepcopy(value))
+
+
+class FakeConfig:
+    """In-memory stand-in for `redbot.core.Config`.
+
+    Reads and writes deep-copy their data, as Red's JSON driver does, and every
+    call is counted in `stats`."""
+
+    GLOBAL = "GLOBAL"
+    GUILD = "GUILD"
+    MEMBER = "MEMBER"
+    USER = "USER"
+
+    def __init__(self):
+        self._data = {}
+        self._defaults = {self.GLOBAL: {}, self.GUILD: {}, self.MEMBER: {}, self.USER: {}}
+
+    @classmethod
+    def get_conf(cls, cog_instance, identifier, force_registration=False):
+        return cls()
+
+    def register_global(self, **defaults):
+        self._defaults[self.GLOBAL].update(defaults)
+
+    def register_guild(self, **defaults):
+        self._defaults[self.GUILD].update(defaults)
+
+    def register_member(self, **defaults):
+        self._defaults[self.MEMBER].update(defaults)
+
+    def register_user(self, **defaults):
+        self._defaults[self.USER].update(defaults)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FakeValue(self, (self.GLOBAL, name), self._defaults[self.GLOBAL].get(name))
+
+    def guild(self, guild):
+        return FakeGroup(self, (self.GUILD, str(guild.id)), self._defaults[self.GUILD])
+
+    def member(self, member):
+        return FakeGroup(self, (self.MEMBER, str(member.guild.id), str(member.id)), self._defaults[self.MEMBER])
+
+    def user(self, user):
+        return FakeGroup(self, (self.USER, str(user.id)), self._defaults[self.USER])
+
+    def _get_base_group(self, category, *primary_keys):
+        return FakeGroup(self, (category,) + primary_keys)
+
+    def _with_defaults(self, category, entries):
+        defaults = self._defaults[category]
+        result = {}
+        for key, data in entries.items():
+            merged = copy.deepcopy(defaults)
+            merged.update(copy.deepcopy(data))
+            result[int(key)] = merged
+        return result
+
+    async def all_members(self, guild=None):
+        stats.record("config.read")
+        members = self._data.get(self.MEMBER, {})
+        if guild is not None:
+            return self._with_defaults(self.MEMBER, members.get(str(guild.id), {}))
+        return {int(guild_id): self._with_defaults(self.MEMBER, accounts) for guild_id, accounts in members.items()}
+
+    async def all_users(self):
+        stats.record("config.read")
+        return self._with_defaults(self.USER, self._data.get(self.USER, {}))
+
+    def _read(self, path):
+        node = self._data
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return _MISSING
+            node = node[key]
+        return node
+
+    def _write(self, path, value):
+        node = self._data
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+
+    def _delete(self, path):
+        node = self._read(path[:-1])
+        if node is not _MISSING:
+            node.pop(path[-1], None)
+
+
+class FakeBank:
+    """In-memory stand-in for `redbot.core.bank`, backed by a `FakeConfig`.
+
+    The functions make the same Config calls as Red's bank module, so the
+    storage counts of a run are close to what a live bot would do."""
+
+    API = (
+        "is_global",
+        "get_balance",
+        "set_balance",
+        "deposit_credits",
+        "withdraw_credits",
+        "can_spend",
+        "get_max_balance",
+        "get_default_balance",
+        "get_currency_name",
+        "get_bank_name",
+        "get_leaderboard",
+        "bank_prune",
+    )
+
+    def __init__(self, is_global=False, default_balance=100, max_balance=MAX_BALANCE, currency="credits"):
+        self._config = FakeConfig()
+        bank_defaults = {
+            "bank_name": "Twentysix bank",
+            "currency": currency,
+            "default_balance": default_balance,
+            "max_balance": max_balance,
+        }
+        account_defaults = {"name": "", "balance": 0, "created_at": 0}
+        self._config.register_global(is_global=is_global, **bank_defaults)
+        self._config.register_guild(**bank_defaults)
+        self._config.register_member(**account_defaults)
+        self._config.register_user(**account_defaults)
+        self._is_global = None
+
+    def seed(self, guild, balances):
+        """Create accounts directly, without counting any storage calls."""
+        now = int(time.time())
+        accounts = self._config._data.setdefault(FakeConfig.MEMBER, {}).setdefault(str(guild.id), {})
+        for member, balance in zip(guild.members, balances):
+            accounts[str(member.id)] = {"name": member.display_name, "balance": int(balance), "created_at": now}
+
+    async def _global(self):
+        # Red caches this flag after the first read.
+        if self._is_global is None:
+            self._is_global = await self._config.is_global()
+        return self._is_global
+
+    async def _group(self, member):
+        if await self._global():
+            return self._config.user(member)
+        return self._config.member(member)
+
+    async def _bank_setting(self, name, guild):
+        if await self._global() or guild is None:
+            return await getattr(self._config, name)()
+        return await getattr(self._config.guild(guild), name)()
+
+    async def is_global(self):
+        stats.record("bank.is_global")
+        return await self._global()
+
+    async def get_balance(self, member):
+        stats.record("bank.get_balance")
+        # Red reads the whole account table to look up a single account.
+        if await self._global():
+            accounts = await self._config.all_users()
+        else:
+            accounts = await self._config.all_members(member.guild)
+        if member.id not in accounts:
+            return await self._bank_setting("default_balance", getattr(member, "guild", None))
+        return accounts[member.id]["balance"]
+
+    async def set_balance(self, member, amount):
+        stats.record("bank.set_balance")
+        if not isinstance(amount, int):
+            raise TypeError("Amount must be of type int, not {}.".format(type(amount)))
+        if amount < 0:
+            raise ValueError("Not allowed to have negative balance.")
+        guild = getattr(member, "guild", None)
+        max_bal = await self._bank_setting("max_balance", guild)
+        if amount > max_bal:
+            currency = await self._bank_setting("currency", guild)
+            raise errors.BalanceTooHigh(user=member.display_name, max_balance=max_bal, currency_name=currency)
+        group = await self._group(member)
+        await group.balance.set(amount)
+        if await group.created_at() == 0:
+            await group.created_at.set(int(time.time()))
+        if await group.name() == "":
+            await group.name.set(member.display_name)
+        return amount
+
+    async def deposit_credits(self, member, amount):
+        stats.record("bank.deposit_credits")
+        if not isinstance(amount, int) or amount < 0:
+            raise ValueError("Invalid deposit amount {}".format(amount))
+        return await self.set_balance(member, await self.get_balance(member) + amount)
+
+    async def withdraw_credits(self, member, amount):
+        stats.record("bank.withdraw_credits")
+        if not isinstance(amount, int) or amount < 0:
+            raise ValueError("Invalid withdrawal amount {}".format(amount))
+        balance = await self.get_balance(member)
+        if amount > balance:
+            raise ValueError("Insufficient funds {} > {}".format(amount, balance))
+        return await self.set_balance(member, balance - amount)
+
+    async def can_spend(self, member, amount):
+        stats.record("bank.can_spend")
+        return await self.get_balance(member) >= amount
+
+    async def get_max_balance(self, guild=None):
+        stats.record("bank.get_max_balance")
+        return await self._bank_setting("max_balance", guild)
+
+    async def get_default_balance(self, guild=None):
+        stats.record("bank.get_default_balance")
+        return await self._bank_setting("default_balance", guild)
+
+    async def get_currency_name(self, guild=None):
+        stats.record("bank.get_currency_name")
+        return await self._bank_setting("currency", guild)
+
+    async def get_bank_name(self, guild=None):
+        stats.record("bank.get_bank_name")
+        return await self._bank_setting("bank_name", guild)
+
+    async def get_leaderboard(self, positions=None, guild=None):
+        stats.record("bank.get_leaderboard")
+        if await self._global():
+            accounts = await self._config.all_users()
+        else:
+            accounts = (await self._config.all_members(guild)) if guild is not None else {}
+        ranked = sorted(accounts.items(), key=lambda item: item[1]["balance"], reverse=True)
+        return ranked[:positions] if positions else ranked
+
+    async def bank_prune(self, bot, guild=None, user_id=None):
+        stats.record("bank.bank_prune")
+
+
+def install(fake_bank):
+    """Point `redbot.core.bank` at `fake_bank`. Returns a function that undoes it."""
+    originals = {name: getattr(bank, name, None) for name in FakeBank.API + ("_config",)}
+    for name in FakeBank.API:
+        setattr(bank, name, getattr(fake_bank, name))
+    bank._config = fake_bank._config
+
+    def uninstall():
+        for name, original in originals.items():
+            setattr(bank, name, original)
+
+    return uninstall
@@ -0,0 +1,237 @@
+"""Concurrent load generator: replays a command mix against the cog on a synthetic guild.
+
+Run it with `python -m benchmarks.load --help`."""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .fakes import stats
+from .runner import SCENARIOS, BenchEnv, summarize
+
+# Each profile is an open-loop arrival process. `rate` is the base rate in
+# commands per second; `spike` multiplies it at t=0 and decays with `decay`
+# seconds. `background` commands run once at the given offset.
+PROFILES = {
+    "steady_chat": {
+        "duration": 10.0,
+        "rate": 50.0,
+        "mix": {"balance": 0.5, "work": 0.3, "bankleaderboard": 0.2},
+        "spike": 1.0,
+        "decay": 1.0,
+        "background": {},
+    },
+    "reset_spike": {
+        "duration": 10.0,
+        "rate": 20.0,
+        "mix": {"work": 0.7, "balance": 0.25, "bankleaderboard": 0.05},
+        "spike": 25.0,
+        "decay": 2.0,
+        "background": {},
+    },
+    "taxes_during_chat": {
+        "duration": 10.0,
+        "rate": 50.0,
+        "mix": {"balance": 0.5, "work": 0.3, "bankleaderboard": 0.2},
+        "spike": 1.0,
+        "decay": 1.0,
+        "background": {"ataraxytaxes": 1.0},
+    },
+    "draw_during_chat": {
+        "duration": 10.0,
+        "rate": 50.0,
+        "mix": {"balance": 0.5, "work": 0.3, "bankleaderboard": 0.2},
+        "spike": 1.0,
+        "decay": 1.0,
+        "background": {"bankdraw": 1.0, "massmoney_numeric": 3.0},
+    },
+}
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that asked to sleep `interval` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - started - self.interval, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+        return summarize(self.samples or [0.0])
+
+
+def rate_at(profile, t):
+    return profile["rate"] * (1 + (profile["spike"] - 1) * math.exp(-t / profile["decay"]))
+
+
+class LoadRun:
+    def __init__(self, env, profile, seed=0):
+        self.env = env
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.calls = Counter()
+        self.tasks = set()
+
+    async def _call(self, name):
+        scenario, _ = SCENARIOS[name]
+        call = self.calls[name]
+        self.calls[name] += 1
+        started = time.perf_counter()
+        try:
+            await scenario(self.env, call)
+        except Exception:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(time.perf_counter() - started)
+
+    def _spawn(self, name):
+        task = asyncio.create_task(self._call(name))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _background(self, name, delay):
+        await asyncio.sleep(delay)
+        await self._call(name)
+
+    async def run(self):
+        mix = self.profile["mix"]
+        names, weights = list(mix), list(mix.values())
+        background = [
+            asyncio.create_task(self._background(name, delay))
+            for name, delay in self.profile["background"].items()
+        ]
+
+        started = time.perf_counter()
+        t = 0.0
+        while True:
+            t += self.rng.expovariate(rate_at(self.profile, t))
+            if t >= self.profile["duration"]:
+                break
+            delay = started + t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._spawn(self.rng.choices(names, weights)[0])
+
+        await asyncio.gather(*background)
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+        return time.perf_counter() - started
+
+
+async def run_load(members, profile_name, profile, seed=0):
+    async with BenchEnv(members, seed) as env:
+        # Warm the caches so the run measures steady-state behaviour.
+        for name in ("balance", "bankleaderboard"):
+            await SCENARIOS[name][0](env, 0)
+
+        stats.reset()
+        load = LoadRun(env, profile, seed)
+        monitor = LoopLagMonitor()
+        monitor.start()
+        elapsed = await load.run()
+        loop_lag = monitor.stop()
+
+    completed = sum(len(samples) for samples in load.latencies.values())
+    all_latencies = [sample for samples in load.latencies.values() for sample in samples]
+    return {
+        "profile": profile_name,
+        "members": members,
+        "settings": profile,
+        "elapsed_s": round(elapsed, 3),
+        "completed": completed,
+        "errors": dict(load.errors),
+        "throughput_per_s": round(completed / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": summarize(all_latencies) if all_latencies else None,
+        "commands": {
+            name: {"count": len(samples), "latency_ms": summarize(samples)}
+            for name, samples in sorted(load.latencies.items())
+        },
+        "loop_lag_ms": loop_lag,
+        "storage": stats.snapshot(),
+    }
+
+
+def _mix(value):
+    """Parse `--mix balance=0.5,work=0.5` into `{command: weight}`."""
+    mix = {}
+    for item in value.split(","):
+        name, sep, weight = item.partition("=")
+        name = name.strip()
+        if not sep or name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"expected command=weight with a command from {', '.join(SCENARIOS)}, got {item!r}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight for {name} is not a number: {weight!r}")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"weight for {name} is negative")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("at least one weight must be above 0")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Concurrent load test for atxbank.")
+    parser.add_argument("--profile", choices=list(PROFILES), action="append",
+                        help="traffic profile, may be repeated (default: all)")
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--rate", type=float, help="override the profile's base commands per second")
+    parser.add_argument("--duration", type=float, help="override the profile's duration in seconds")
+    parser.add_argument("--mix", type=_mix,
+                        help="replace the profile's command mix, e.g. balance=0.5,work=0.3,bankleaderboard=0.2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.profile or list(PROFILES):
+        profile = dict(PROFILES[name])
+        if args.rate is not None:
+            profile["rate"] = args.rate
+        if args.duration is not None:
+            profile["duration"] = args.duration
+        if args.mix is not None:
+            profile["mix"] = args.mix
+        result = asyncio.run(run_load(args.members, name, profile, args.seed))
+        latency = result["latency_ms"] or {"p50": 0, "p99": 0}
+        print(
+            f"{name:>18} {args.members:>7,} members  {result['throughput_per_s']:>8.1f} cmd/s  "
+            f"p50 {latency['p50']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+            f"loop lag p99 {result['loop_lag_ms']['p99']:.2f}ms",
+            file=sys.stderr,
+        )
+        results.append(result)
+
+    report = {
+        "schema": 1,
+        "meta": {"timestamp": time.time(), "numpy": np.__version__, "seed": args.seed},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
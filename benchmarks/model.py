@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import types
+
+import numpy as np
+
+from atxbank.tiers import DEFAULT_ROLE_TIERS
+
+_ids = itertools.count(10 ** 17)
+
+# Share of members holding each level role. Levels are cumulative, as MEE6
+# hands them out: everyone with Lv40 also has Lv20 and Lv30.
+LEVEL_SHARES = {"Lv10": 0.70, "Lv20": 0.45, "Lv30": 0.25, "Lv40": 0.12, "Lv50": 0.06, "Lv70": 0.02, "Lv100": 0.005}
+VOTER_SHARE = 0.20
+BOOSTER_SHARE = 0.03
+BOT_SHARE = 0.005
+
+
+class FakeRole:
+    def __init__(self, guild, name, role_id=None):
+        self.id = role_id or next(_ids)
+        self.guild = guild
+        self.name = name
+        self.members = []
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+
+class FakeMember:
+    def __init__(self, guild, index, bot=False):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = self.display_name = f"member{index}"
+        self.discriminator = f"{index % 10000:04}"
+        self.bot = bot
+        self.roles = []
+        self.avatar_url = ""
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+        # Red's reaction predicates read the bot's own ID from here.
+        self._state = types.SimpleNamespace(self_id=0)
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        self.content = content
+        self.embed = embed
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def remove_reaction(self, emoji, member):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, guild, name):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, **kwargs):
+        self.sent += 1
+        return FakeMessage(self, content, embed)
+
+
+class FakeGuild:
+    def __init__(self, name):
+        self.id = next(_ids)
+        self.name = name
+        self.icon_url = ""
+        self.owner = None
+        self.members = []
+        self.roles = []
+        self.channels = []
+        self._members = {}
+        self._roles = {}
+
+    def add_role(self, name, role_id=None):
+        role = FakeRole(self, name, role_id)
+        self.roles.append(role)
+        self._roles[role.id] = role
+        return role
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.channels if c.id == channel_id), None)
+
+
+class FakeContext:
+    """Just enough of `commands.Context` for the cog's command callbacks."""
+
+    clean_prefix = ";"
+
+    def __init__(self, bot, guild, author, channel):
+        self.bot = bot
+        self.guild = guild
+        self.author = author
+        self.channel = channel
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def send_help(self):
+        pass
+
+    async def tick(self):
+        pass
+
+    async def embed_colour(self):
+        return 0
+
+    async def embed_requested(self):
+        return True
+
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.guilds = list(guilds)
+        self.user = None
+
+    async def wait_until_red_ready(self):
+        pass
+
+    async def is_owner(self, user):
+        return user is not None and user is user.guild.owner
+
+    async def wait_for(self, event, check=None, timeout=None):
+        # Nobody ever reacts to a menu in a benchmark.
+        raise asyncio.TimeoutError
+
+    def get_guild(self, guild_id):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+
+def make_guild(size, seed=0):
+    """Build a guild of `size` members with tier, voter and booster roles.
+
+    Returns the guild and a dict of its notable roles and channels."""
+    rng = np.random.default_rng(seed)
+    guild = FakeGuild(f"bench-{size}")
+
+    levels = {}
+    for role_id, tier in DEFAULT_ROLE_TIERS.items():
+        levels[tier["name"]] = guild.add_role(tier["name"], int(role_id))
+    levels["Lv10"] = guild.add_role("Lv10")
+    voter = guild.add_role("Voter")
+    booster = guild.add_role("Booster")
+
+    is_bot = rng.random(size) < BOT_SHARE
+    level_rolls = rng.random(size)
+    voter_rolls = rng.random(size)
+    booster_rolls = rng.random(size)
+    for index in range(size):
+        member = FakeMember(guild, index, bot=bool(is_bot[index]))
+        if not member.bot:
+            held = [levels[name] for name, share in LEVEL_SHARES.items() if level_rolls[index] < share]
+            if voter_rolls[index] < VOTER_SHARE:
+                held.append(voter)
+            if booster_rolls[index] < BOOSTER_SHARE:
+                held.append(booster)
+            member.roles = held
+            for role in held:
+                role.members.append(member)
+        guild.members.append(member)
+        guild._members[member.id] = member
+
+    guild.owner = next(m for m in guild.members if not m.bot)
+    general = FakeChannel(guild, "general")
+    draws = FakeChannel(guild, "draws")
+    guild.channels = [general, draws]
+    return guild, {"draw_role": levels["Lv10"], "voter": voter, "booster": booster, "general": general, "draws": draws}
+
+
+def seed_balances(size, seed=0):
+    """Lognormal balances, so a few accounts hold most of the money."""
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(mean=7.0, sigma=1.2, size=size).astype(np.int64)
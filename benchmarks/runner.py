@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import atxbank.atxbank as cog_module
+from atxbank.atxbank import AtaraxyBank
+
+from .fakes import FakeBank, FakeConfig, install, stats
+from .model import FakeBot, FakeContext, make_guild, seed_balances
+
+
+class BenchEnv:
+    """A loaded cog on a synthetic guild, backed by the in-memory fakes."""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    async def __aenter__(self):
+        self.fake_bank = FakeBank()
+        self._uninstall = install(self.fake_bank)
+        self._real_config, cog_module.Config = cog_module.Config, FakeConfig
+        # The transaction history and profiles go to a throwaway data folder.
+        self._data_dir = tempfile.TemporaryDirectory(prefix="atxbank-bench-")
+        self._real_data_path = cog_module.cog_data_path
+        cog_module.cog_data_path = lambda cog: Path(self._data_dir.name)
+
+        self.guild, self.fixtures = make_guild(self.size, self.seed)
+        self.fake_bank.seed(self.guild, seed_balances(self.size, self.seed))
+        self.bot = FakeBot([self.guild])
+        self.cog = AtaraxyBank(self.bot)
+        # Let the cog's startup task and the first clamp sweep finish.
+        await asyncio.sleep(0.05)
+
+        guild_config = self.cog.config.guild(self.guild)
+        await guild_config.work_min.set(50)
+        await guild_config.work_max.set(150)
+        await guild_config.draw_payout.set(500)
+        await guild_config.draw_required_role.set(self.fixtures["draw_role"].id)
+        await guild_config.draw_announcement.set(self.fixtures["draws"].id)
+        await guild_config.voter_role_id.set(self.fixtures["voter"].id)
+        await guild_config.booster_role_id.set(self.fixtures["booster"].id)
+        self.members = [m for m in self.guild.members if not m.bot]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.cog.cog_unload()
+        await asyncio.sleep(0)
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.cog._shutdown()
+        cog_module.Config = self._real_config
+        cog_module.cog_data_path = self._real_data_path
+        self._data_dir.cleanup()
+        self._uninstall()
+
+    def context(self, author=None):
+        if author is None:
+            author = self.guild.owner
+        return FakeContext(self.bot, self.guild, author, self.fixtures["general"])
+
+    def random_member(self):
+        return self.rng.choice(self.members)
+
+
+async def _work(env, call):
+    await env.cog.work.callback(env.cog, env.context(env.members[call % len(env.members)]))
+
+
+async def _balance(env, call):
+    await env.cog.balance.callback(env.cog, env.context(env.random_member()))
+
+
+async def _leaderboard(env, call):
+    await env.cog.bankleaderboard.callback(env.cog, env.context(env.random_member()), 10)
+
+
+async def _draw(env, call):
+    await env.cog.bankdraw.callback(env.cog, env.context(), 1)
+
+
+async def _taxes(env, call):
+    await env.cog.ataraxytaxes.callback(env.cog, env.context())
+
+
+async def _percent(env, call):
+    await env.cog.percent.callback(env.cog, env.context(), 0.01, "income", None)
+
+
+async def _numeric(env, call):
+    await env.cog.numeric.callback(env.cog, env.context(), 10, "income", None)
+
+
+# name: (callable, whole-guild operation)
+SCENARIOS = {
+    "work": (_work, False),
+    "balance": (_balance, False),
+    "bankleaderboard": (_leaderboard, False),
+    "bankdraw": (_draw, False),
+    "ataraxytaxes": (_taxes, True),
+    "massmoney_percent": (_percent, True),
+    "massmoney_numeric": (_numeric, True),
+}
+
+
+def summarize(latencies):
+    """Latency percentiles in milliseconds."""
+    samples = np.asarray(latencies) * 1000
+    return {
+        "first": round(float(samples[0]), 3),
+        "mean": round(float(samples.mean()), 3),
+        "p50": round(float(np.percentile(samples, 50)), 3),
+        "p95": round(float(np.percentile(samples, 95)), 3),
+        "p99": round(float(np.percentile(samples, 99)), 3),
+        "max": round(float(samples.max()), 3),
+    }
+
+
+async def run_scenario(env, name, iterations):
+    """Call a scenario `iterations` times and report its latency and storage calls."""
+    scenario, _ = SCENARIOS[name]
+    stats.reset()
+    latencies = []
+    for call in range(iterations):
+        started = time.perf_counter()
+        await scenario(env, call)
+        latencies.append(time.perf_counter() - started)
+    counts = stats.snapshot()
+    return {
+        "scenario": name,
+        "members": env.size,
+        "iterations": iterations,
+        "latency_ms": summarize(latencies),
+        "storage": counts,
+        "storage_per_call": {op: round(count / iterations, 3) for op, count in counts.items()},
+    }
+
+
+async def run(sizes, scenarios, iterations, mass_iterations, seed=0, progress=None):
+    results = []
+    for size in sizes:
+        async with BenchEnv(size, seed) as env:
+            for name in scenarios:
+                count = mass_iterations if SCENARIOS[name][1] else iterations
+                result = await run_scenario(env, name, count)
+                if progress is not None:
+                    progress(result)
+                results.append(result)
+    return results